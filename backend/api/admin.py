@@ -33,11 +33,12 @@ class SubscriptionAdmin(admin.ModelAdmin):
 
 @admin.register(models.Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('author', 'name', 'image_tag')
+    list_display = ('author', 'name', 'image_tag', 'favorites_count',
+                    'in_carts_count')
     search_fields = ('user', 'author')
     list_filter = ('author', 'name', 'tags')
     inlines = [RecipeIngredientInLine]
-    readonly_fields = ('image_tag',)
+    readonly_fields = ('image_tag', 'favorites_count', 'in_carts_count')
 
     def image_tag(self, instance):
         return format_html(
@@ -46,3 +47,10 @@ class RecipeAdmin(admin.ModelAdmin):
         )
 
     image_tag.short_description = 'Предпросмотр изображения'
+
+
+@admin.register(models.StoredFile)
+class StoredFileAdmin(admin.ModelAdmin):
+    list_display = ('name', 'references', 'updated_at')
+    search_fields = ('name',)
+    list_filter = ('updated_at',)
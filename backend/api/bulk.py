@@ -0,0 +1,67 @@
+from django.db import connection
+
+from . import (counters, images, ingredient_index, media, recipe_cache,
+               versions)
+from .models import Ingredient, Recipe, Tag
+
+
+def save_recipes(recipes):
+    """Сохраняет пачку новых рецептов.
+
+    Django 3.2 получает id из bulk_create только на PostgreSQL, поэтому
+    на остальных СУБД рецепты сохраняются по одному через save() вместе
+    с обычными сигналами. Ссылки на файлы и уменьшенные копии
+    изображений при пакетной вставке обрабатываются здесь, счетчики
+    пересчитывает finish_bulk_load().
+    """
+    if not connection.features.can_return_rows_from_bulk_insert:
+        for recipe in recipes:
+            recipe.save()
+        return
+    Recipe.objects.bulk_create(recipes)
+    media.add_references(
+        name for recipe in recipes for name in media.recipe_files(recipe)
+    )
+    for recipe in recipes:
+        source = (recipe.image_variants or {}).get('source')
+        if recipe.image and source != recipe.image.name:
+            images.schedule_variants(recipe)
+
+
+def get_ingredients(pairs):
+    """Ингредиенты по парам (name, measurement_unit), недостающие
+    создаются."""
+    pairs = set(pairs)
+    Ingredient.objects.bulk_create(
+        [Ingredient(name=name, measurement_unit=unit)
+         for name, unit in pairs],
+        ignore_conflicts=True
+    )
+    names = {name for name, unit in pairs}
+    return {
+        (ingredient.name, ingredient.measurement_unit): ingredient
+        for ingredient in Ingredient.objects.filter(name__in=names)
+        if (ingredient.name, ingredient.measurement_unit) in pairs
+    }
+
+
+def get_tags(tags):
+    """Теги по slug из словарей с name, color и slug, недостающие
+    создаются."""
+    tags = {tag['slug']: tag for tag in tags}
+    Tag.objects.bulk_create(
+        [Tag(name=tag['name'], color=tag['color'], slug=slug)
+         for slug, tag in tags.items()],
+        ignore_conflicts=True
+    )
+    return Tag.objects.in_bulk(tags, field_name='slug')
+
+
+def finish_bulk_load():
+    """Пакетная вставка обходит сигналы: пересчитывает счетчики и
+    сбрасывает кэши, зависящие от рецептов и справочников."""
+    counters.rebuild()
+    versions.bump_model_version(Tag)
+    versions.bump_model_version(Ingredient)
+    ingredient_index.invalidate()
+    recipe_cache.bump_list_generation()
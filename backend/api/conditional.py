@@ -0,0 +1,33 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+
+def make_etag(*parts):
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def conditional_get(etag_func, **cache_control):
+    """Декоратор действий ViewSet: считает ETag до сериализации и на
+    совпадающий If-None-Match отвечает 304, не вызывая действие.
+
+    etag_func(view, request, *args, **kwargs) возвращает строку ETag или
+    None, если условный запрос для этого ответа не поддерживается.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            etag = etag_func(self, request, *args, **kwargs)
+            if etag is None:
+                return method(self, request, *args, **kwargs)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                patch_cache_control(response, **cache_control)
+            return response
+        return wrapper
+    return decorator
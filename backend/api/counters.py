@@ -0,0 +1,80 @@
+from functools import lru_cache
+
+from django.apps import apps as global_apps
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# Денормализованный счетчик: (модель со счетчиком, поле счетчика,
+# модель учитываемых строк, ее внешний ключ на модель со счетчиком).
+COUNTERS = (
+    ('api.Recipe', 'favorites_count', 'api.Favorite', 'recipe'),
+    ('api.Recipe', 'in_carts_count', 'api.ShoppingCart', 'recipe'),
+    ('users.CustomUser', 'recipes_count', 'api.Recipe', 'author'),
+    ('users.CustomUser', 'subscribers_count', 'api.Subscription', 'author'),
+)
+
+
+@lru_cache(maxsize=None)
+def get_counters(source):
+    """Счетчики, которые зависят от строк модели source, в виде троек
+    (модель со счетчиком, поле счетчика, attname внешнего ключа)."""
+    return [
+        (global_apps.get_model(target), field,
+         source._meta.get_field(foreign_key).attname)
+        for target, field, source_label, foreign_key in COUNTERS
+        if source._meta.label == source_label
+    ]
+
+
+def change(model, pk, field, delta):
+    """Сдвигает счетчик одним UPDATE с F(), не опуская его ниже нуля."""
+    if pk is None:
+        return
+    queryset = model.objects.filter(pk=pk)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def remember(instance):
+    instance._counted_keys = {
+        attname: getattr(instance, attname)
+        for model, field, attname in get_counters(type(instance))
+    }
+
+
+def count_saved(instance, created):
+    """Учитывает новую строку, а у измененной - смену внешнего ключа."""
+    previous = getattr(instance, '_counted_keys', {})
+    for model, field, attname in get_counters(type(instance)):
+        current = getattr(instance, attname)
+        if created:
+            change(model, current, field, 1)
+        elif attname in previous and previous[attname] != current:
+            change(model, previous[attname], field, -1)
+            change(model, current, field, 1)
+    remember(instance)
+
+
+def count_deleted(instance):
+    for model, field, attname in get_counters(type(instance)):
+        change(model, getattr(instance, attname), field, -1)
+
+
+def rebuild():
+    """Пересчитывает все счетчики по фактическим строкам и возвращает
+    число исправленных записей для каждого из них."""
+    fixed = {}
+    for target, field, source, foreign_key in COUNTERS:
+        model = global_apps.get_model(target)
+        actual = Coalesce(Subquery(
+            global_apps.get_model(source).objects.filter(
+                **{foreign_key: OuterRef('pk')}
+            ).order_by().values(foreign_key).annotate(
+                total=Count('pk')
+            ).values('total')
+        ), Value(0))
+        fixed[f'{target}.{field}'] = model.objects.exclude(
+            **{field: actual}
+        ).update(**{field: actual})
+    return fixed
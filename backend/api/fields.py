@@ -1,5 +1,5 @@
 import base64
-import imghdr
+import binascii
 import uuid
 
 from django.core.files.base import ContentFile
@@ -7,6 +7,8 @@ from django.core.files.base import ContentFile
 import six
 from rest_framework import serializers
 
+from . import images
+
 
 class Base64ImageField(serializers.ImageField):
 
@@ -16,16 +18,32 @@ class Base64ImageField(serializers.ImageField):
                 header, data = data.split(';base64,')
             try:
                 decoded_file = base64.b64decode(data)
-            except TypeError:
+                decoded_file, file_extension = images.sanitize(decoded_file)
+            except (TypeError, binascii.Error, images.InvalidImage):
                 self.fail('invalid_image')
             file_name = str(uuid.uuid4())[:12]
-            file_extension = self.get_file_extension(file_name, decoded_file)
             complete_file_name = '%s.%s' % (file_name, file_extension, )
             data = ContentFile(decoded_file, name=complete_file_name)
+        elif hasattr(data, 'read'):
+            try:
+                content, file_extension = images.sanitize(data)
+            except images.InvalidImage:
+                self.fail('invalid_image')
+            file_name = str(uuid.uuid4())[:12]
+            data = ContentFile(content, name=f'{file_name}.{file_extension}')
         return super().to_internal_value(data)
 
-    def get_file_extension(self, file_name, decoded_file):
-        extension = imghdr.what(file_name, decoded_file)
-        if extension == 'jpeg':
-            extension = 'jpg'
-        return extension
+
+class ImageVariantsField(serializers.Field):
+    """Карта уменьшенных копий изображения рецепта вида
+    {'webp': {'320': url, ...}, 'jpeg': {...}} для srcset."""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        return images.variants_representation(
+            recipe, self.context.get('request')
+        )
@@ -1,6 +1,7 @@
 from django_filters import BooleanFilter, CharFilter, FilterSet
 
 from .models import Recipe
+from .search import search_recipes
 
 
 class RecipeFilter(FilterSet):
@@ -9,10 +10,12 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = BooleanFilter(
         method='get_is_in_shopping_cart'
     )
+    search = CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
-        fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags')
+        fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags',
+                  'search')
 
     def filter_tags(self, queryset, slug, tags):
         tags = self.request.query_params.getlist('tags')
@@ -22,12 +25,19 @@ class RecipeFilter(FilterSet):
 
     def get_favorite(self, queryset, name, value):
         user = self.request.user
-        if value:
-            return Recipe.objects.filter(favorite_recipe__user=user)
-        return Recipe.objects.all()
+        if not value:
+            return queryset
+        if not user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(favorite_recipe__user=user)
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
-        if value:
-            return Recipe.objects.filter(customers__user=user)
-        return Recipe.objects.all()
+        if not value:
+            return queryset
+        if not user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(customers__user=user)
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
@@ -0,0 +1,176 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from PIL import Image, ImageOps
+
+from . import media, recipe_cache, versions
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+MAX_PIXELS = 40_000_000
+SOURCE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+VARIANTS_DIR = 'recipes/variants'
+
+_executor_lock = threading.Lock()
+_executor = None
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def open_image(content):
+    """Открывает изображение из bytes или файлового объекта."""
+    file = io.BytesIO(content) if isinstance(content, bytes) else content
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            image.verify()
+        file.seek(0)
+        image = Image.open(file)
+    except (OSError, SyntaxError, Image.DecompressionBombError) as error:
+        raise InvalidImage(str(error)) from error
+    if image.width * image.height > MAX_PIXELS:
+        raise InvalidImage('Слишком большое изображение')
+    return image
+
+
+def flatten(image):
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def sanitize(content):
+    """Проверяет изображение (bytes или файл) и пересохраняет его без
+    метаданных (EXIF, GPS, ICC) с учетом ориентации из EXIF.
+
+    Возвращает пару (байты, расширение файла).
+    """
+    image = open_image(content)
+    image_format = image.format if image.format in SOURCE_FORMATS else 'PNG'
+    image = ImageOps.exif_transpose(image)
+    if image_format == 'JPEG':
+        image = flatten(image)
+    elif image.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+        image = image.convert('RGBA')
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, quality=90, optimize=True)
+    return buffer.getvalue(), SOURCE_FORMATS[image_format]
+
+
+def variant_name(source_name, width, extension):
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    return f'{VARIANTS_DIR}/{stem}-{width}.{extension}'
+
+
+def build_variants(source_name):
+    """Создает уменьшенные копии изображения во всех форматах и
+    возвращает их карту для Recipe.image_variants."""
+    with default_storage.open(source_name) as file:
+        image = flatten(ImageOps.exif_transpose(open_image(file.read())))
+    variants = {'source': source_name}
+    widths = [width for width in VARIANT_WIDTHS if width < image.width]
+    widths = widths or [image.width]
+    for extension, image_format in VARIANT_FORMATS.items():
+        variants[extension] = {}
+        for width in widths:
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, max(height, 1)), Image.LANCZOS)
+            buffer = io.BytesIO()
+            resized.save(buffer, format=image_format, quality=80,
+                         optimize=True)
+            name = default_storage.save(
+                variant_name(source_name, width, extension),
+                ContentFile(buffer.getvalue())
+            )
+            variants[extension][str(width)] = name
+    return variants
+
+
+def generate_variants(recipe_id, source_name):
+    """Создает уменьшенные копии изображения рецепта и сохраняет их
+    список в Recipe.image_variants."""
+    try:
+        variants = build_variants(source_name)
+        with transaction.atomic():
+            recipe = Recipe.objects.select_for_update().only(
+                'image', 'image_variants'
+            ).filter(pk=recipe_id, image=source_name).first()
+            if recipe is None:
+                return
+            # Ссылки меняются только на разницу с уже сохраненными
+            # копиями, так что повторный запуск их не накручивает.
+            previous = media.recipe_files(recipe)
+            recipe.image_variants = variants
+            current = media.recipe_files(recipe)
+            Recipe.objects.filter(pk=recipe_id).update(
+                image_variants=variants
+            )
+            media.add_references(current - previous)
+            media.remove_references(previous - current)
+            versions.bump_recipe_versions([recipe_id])
+            recipe_cache.bump_list_generation()
+    except Exception:
+        logger.exception('Не удалось обработать изображение %s',
+                         source_name)
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connection.close()
+
+
+def get_executor():
+    global _executor
+    workers = getattr(settings, 'IMAGE_VARIANT_WORKERS', 2)
+    if not workers:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='image-variants'
+            )
+        return _executor
+
+
+def schedule_variants(recipe):
+    """Ставит генерацию вариантов в фоновый пул после коммита; при
+    IMAGE_VARIANT_WORKERS = 0 выполняет ее синхронно."""
+    recipe_id, source_name = recipe.pk, recipe.image.name
+
+    def submit():
+        executor = get_executor()
+        if executor is None:
+            generate_variants(recipe_id, source_name)
+        else:
+            executor.submit(generate_variants, recipe_id, source_name)
+
+    transaction.on_commit(submit)
+
+
+def variants_representation(recipe, request=None):
+    variants = recipe.image_variants or {}
+    if not recipe.image or variants.get('source') != recipe.image.name:
+        return {}
+    representation = {}
+    for extension in VARIANT_FORMATS:
+        representation[extension] = {}
+        for width, name in variants.get(extension, {}).items():
+            url = default_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            representation[extension][width] = url
+    return representation
@@ -0,0 +1,69 @@
+import threading
+from bisect import bisect_left
+
+from . import versions
+from .models import Ingredient
+
+SEARCH_LIMIT = 50
+
+_lock = threading.Lock()
+_index = None
+_index_version = None
+
+
+class IngredientIndex:
+    """Отсортированный по имени снимок каталога ингредиентов.
+
+    Поиск по префиксу идет бинарным поиском, затем добираются совпадения
+    по подстроке; в выдаче сначала префиксные совпадения, потом остальные.
+    """
+
+    def __init__(self, ingredients):
+        self.items = sorted(
+            ingredients, key=lambda item: (item['name'].lower(), item['id'])
+        )
+        self.keys = [item['name'].lower() for item in self.items]
+
+    def __len__(self):
+        return len(self.items)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        query = query.strip().lower()
+        if not query:
+            return self.items[:limit]
+        start = bisect_left(self.keys, query)
+        end = start
+        while end < len(self.keys) and self.keys[end].startswith(query):
+            end += 1
+        result = self.items[start:min(end, start + limit)]
+        for position, key in enumerate(self.keys):
+            if len(result) >= limit:
+                break
+            if start <= position < end:
+                continue
+            if query in key:
+                result.append(self.items[position])
+        return result
+
+
+def get_index():
+    global _index, _index_version
+    version = versions.get_model_version(Ingredient)
+    index = _index
+    if index is not None and _index_version == version:
+        return index
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = IngredientIndex(
+                Ingredient.objects.values('id', 'name', 'measurement_unit')
+            )
+            _index_version = version
+        return _index
+
+
+def invalidate():
+    """Сбрасывает индекс в этом процессе; остальные процессы перестроят
+    его, увидев новую версию модели Ingredient в общем кэше."""
+    global _index
+    with _lock:
+        _index = None
@@ -0,0 +1,315 @@
+import base64
+import io
+import json
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api import ingredient_index, shopping_list
+from api.models import Ingredient, Recipe, ShoppingCart, Subscription, Tag
+
+User = get_user_model()
+METRICS = ('p50_ms', 'p95_ms', 'queries', 'peak_memory_kb')
+BENCHMARK_CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'foodgram-benchmark',
+}}
+
+
+def make_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), (73, 182, 78)).save(buffer, 'JPEG')
+    return ('data:image/jpeg;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+class Scenario:
+    """Запрос к эндпоинту; cleanup возвращает данные в исходное
+    состояние после каждого замера и в замер не входит."""
+
+    def __init__(self, name, user, request, cleanup=None):
+        self.name = name
+        self.client = APIClient()
+        if user is not None:
+            self.client.force_authenticate(user)
+        self.request = request
+        self.cleanup = cleanup
+
+    def run(self):
+        response = self.request(self.client)
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{self.name}: ответ {response.status_code} '
+                f'{getattr(response, "data", "")}'
+            )
+        if self.cleanup is not None:
+            self.cleanup(self.client)
+        return response
+
+
+def clear_caches():
+    cache.clear()
+    shopping_list.document_cache.clear()
+    ingredient_index.invalidate()
+
+
+def measure(scenario, iterations, warmup, cold):
+    for _ in range(warmup):
+        scenario.run()
+    timings, queries = [], []
+    for _ in range(iterations):
+        if cold:
+            clear_caches()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            scenario.request(scenario.client)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(context.captured_queries))
+        if scenario.cleanup is not None:
+            scenario.cleanup(scenario.client)
+    if cold:
+        clear_caches()
+    tracemalloc.start()
+    try:
+        scenario.run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    if len(timings) > 1:
+        p95 = statistics.quantiles(timings, n=20, method='inclusive')[18]
+    else:
+        p95 = timings[0]
+    return {
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(p95, 3),
+        'queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def get_conditions(options):
+    """Условия прогона, при которых результаты сравнимы между собой."""
+    return {
+        'dataset': {
+            'users': options['users'],
+            'recipes': options['recipes'],
+            'seed': options['seed'],
+            'database': connection.vendor,
+        },
+        'iterations': options['iterations'],
+        'cold': options['cold'],
+    }
+
+
+def find_regressions(results, baseline, tolerance, query_tolerance):
+    regressions = []
+    for name, base in baseline['endpoints'].items():
+        current = results['endpoints'].get(name)
+        if current is None:
+            regressions.append(f'{name}: нет в текущем прогоне')
+            continue
+        for metric in METRICS:
+            if metric == 'queries':
+                limit = base[metric] + query_tolerance
+            else:
+                limit = base[metric] * (1 + tolerance)
+            if current[metric] > limit:
+                regressions.append(
+                    f'{name}: {metric} {current[metric]} > {limit:g} '
+                    f'(база {base[metric]})'
+                )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = ('Замеряет основные эндпоинты API на фиксированном наборе '
+            'данных во временной тестовой базе: p50/p95 времени ответа, '
+            'число SQL-запросов и пик памяти')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=300)
+        parser.add_argument('--recipes', type=int, default=3000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэши перед каждым замером'
+        )
+        parser.add_argument('--only', nargs='+', metavar='ENDPOINT',
+                            help='Замерить только эти эндпоинты')
+        parser.add_argument('--output', help='Сохранить результат в JSON')
+        parser.add_argument(
+            '--compare', metavar='BASELINE',
+            help='Сравнить с сохраненным результатом и завершиться '
+                 'с ошибкой при ухудшении'
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый относительный рост времени и памяти'
+        )
+        parser.add_argument(
+            '--query-tolerance', type=int, default=0,
+            help='Допустимый рост числа запросов'
+        )
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as file:
+                baseline = json.load(file)
+            conditions = get_conditions(options)
+            recorded = {key: baseline.get(key) for key in conditions}
+            if recorded != conditions:
+                raise CommandError(
+                    f'База снята при других условиях: {recorded}'
+                )
+        media_root = tempfile.mkdtemp(prefix='foodgram-benchmark-')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb']
+        )
+        try:
+            # Свой кэш и каталог файлов, чтобы не задеть рабочие;
+            # копии изображений строятся синхронно внутри замера.
+            with override_settings(MEDIA_ROOT=media_root,
+                                   CACHES=BENCHMARK_CACHES,
+                                   IMAGE_VARIANT_WORKERS=0):
+                results = self.benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb']
+            )
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2, ensure_ascii=False)
+        if baseline is not None:
+            regressions = find_regressions(
+                results, baseline, options['tolerance'],
+                options['query_tolerance']
+            )
+            if regressions:
+                raise CommandError(
+                    'Ухудшение относительно базы:\n' + '\n'.join(regressions)
+                )
+            self.stdout.write('Ухудшений относительно базы нет')
+
+    def benchmark(self, options):
+        clear_caches()
+        if not Recipe.objects.exists():
+            call_command(
+                'generate_data', users=options['users'],
+                recipes=options['recipes'], seed=options['seed'],
+                ingredients=500, stderr=io.StringIO()
+            )
+        results = dict(get_conditions(options), endpoints={})
+        for scenario in self.get_scenarios():
+            if options['only'] and scenario.name not in options['only']:
+                continue
+            result = measure(scenario, options['iterations'],
+                             options['warmup'], options['cold'])
+            results['endpoints'][scenario.name] = result
+            self.stdout.write(
+                '{name:<28} p50 {p50_ms:>9.2f} мс  p95 {p95_ms:>9.2f} мс  '
+                '{queries:>4} запросов  {peak_memory_kb:>9.1f} КБ'.format(
+                    name=scenario.name, **result
+                )
+            )
+        return results
+
+    def get_scenarios(self):
+        heavy = ShoppingCart.objects.values('user').annotate(
+            total=Count('pk')
+        ).order_by('-total', 'user').first()
+        shopper = User.objects.get(pk=heavy['user'])
+        follower = Subscription.objects.values('user').annotate(
+            total=Count('pk')
+        ).order_by('-total', 'user').first()
+        follower = User.objects.get(pk=follower['user'])
+        recipe = Recipe.objects.order_by('-favorites_count', 'pk').first()
+        author = recipe.author
+        ingredients = list(Ingredient.objects.order_by('pk')[:10])
+        tags = list(Tag.objects.values_list('pk', flat=True))
+        image = make_image()
+        free = Recipe.objects.exclude(
+            customers__user=follower
+        ).exclude(favorite_recipe__user=follower).order_by('pk').first()
+        payload = {
+            'name': 'Бенчмарк', 'text': 'Описание', 'cooking_time': 30,
+            'image': image, 'tags': tags,
+            'ingredients': [{'id': ingredient.pk, 'amount': number + 1}
+                            for number, ingredient in enumerate(ingredients)],
+        }
+        created = []
+
+        def create(client):
+            response = client.post('/api/recipes/', payload, format='json')
+            created.append(response.data['id'])
+            return response
+
+        def delete_created(client):
+            Recipe.objects.filter(pk__in=created).delete()
+            created.clear()
+
+        return [
+            Scenario('recipes-list', follower,
+                     lambda client: client.get('/api/recipes/?limit=6')),
+            Scenario('recipes-list-anonymous', None,
+                     lambda client: client.get('/api/recipes/?limit=6')),
+            Scenario('recipes-list-filtered', follower,
+                     lambda client: client.get(
+                         '/api/recipes/?limit=6&is_favorited=true'
+                     )),
+            Scenario('recipes-retrieve', follower,
+                     lambda client: client.get(f'/api/recipes/{recipe.pk}/')),
+            Scenario('recipes-create', author, create, delete_created),
+            Scenario('recipes-update', author,
+                     lambda client: client.put(
+                         f'/api/recipes/{recipe.pk}/',
+                         dict(payload, name=recipe.name), format='json'
+                     )),
+            Scenario('recipes-favorite', follower,
+                     lambda client: client.get(
+                         f'/api/recipes/{free.pk}/favorite/'
+                     ),
+                     lambda client: client.delete(
+                         f'/api/recipes/{free.pk}/favorite/'
+                     )),
+            Scenario('recipes-shopping-cart', follower,
+                     lambda client: client.get(
+                         f'/api/recipes/{free.pk}/shopping_cart/'
+                     ),
+                     lambda client: client.delete(
+                         f'/api/recipes/{free.pk}/shopping_cart/'
+                     )),
+            Scenario('recipes-download-shopping-cart', shopper,
+                     lambda client: client.get(
+                         '/api/recipes/download_shopping_cart/'
+                     )),
+            Scenario('users-subscriptions', follower,
+                     lambda client: client.get(
+                         '/api/users/subscriptions/?recipes_limit=3'
+                     )),
+            Scenario('ingredients-search', None,
+                     lambda client: client.get(
+                         '/api/ingredients/?name=ингредиент synthetic 1'
+                     )),
+        ]
@@ -0,0 +1,50 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from api import shopping_list
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время рендеринга PDF списка покупок от длины списка'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lengths', type=int, nargs='+',
+                            default=[10, 50, 100, 500, 1000, 5000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', help='Файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        shopping_list.register_fonts()
+        results = {
+            'font_registration_seconds': time.perf_counter() - started,
+            'runs': [],
+        }
+        for length in options['lengths']:
+            items = [(f'Ингредиент номер {number}', number, 'г')
+                     for number in range(length)]
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                content = shopping_list.render_pdf(items, 'benchmark')
+                timings.append(time.perf_counter() - started)
+            pages = -(-len(shopping_list.layout_lines(items))
+                      // shopping_list.LINES_PER_PAGE)
+            run = {
+                'length': length,
+                'pages': max(pages, 1),
+                'bytes': len(content),
+                'median_seconds': statistics.median(timings),
+                'min_seconds': min(timings),
+            }
+            results['runs'].append(run)
+            self.stdout.write(
+                '{length:>7} позиций {pages:>5} стр. {bytes:>9} байт '
+                '{median_seconds:.4f} с (медиана)'.format(**run)
+            )
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2)
@@ -0,0 +1,83 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api import media
+from api.models import Recipe, StoredFile
+
+
+def walk(directory):
+    directories, files = default_storage.listdir(directory)
+    for file_name in files:
+        yield os.path.join(directory, file_name)
+    for name in directories:
+        yield from walk(os.path.join(directory, name))
+
+
+class Command(BaseCommand):
+    help = ('Удаляет из хранилища файлы, на которые не ссылается '
+            'ни один рецепт')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=int, default=24,
+            help='Не удалять файлы, потерявшие ссылки позже этого срока'
+        )
+        parser.add_argument(
+            '--rebuild', action='store_true',
+            help='Пересчитать ссылки по рецептам и файлам на диске'
+        )
+        parser.add_argument('--directory', default='recipes')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            self.rebuild(options['directory'], options['dry_run'])
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        garbage = StoredFile.objects.filter(
+            references__lte=0, updated_at__lt=cutoff
+        )
+        deleted = 0
+        for stored_file in garbage.iterator():
+            if not options['dry_run']:
+                default_storage.delete(stored_file.name)
+                stored_file.delete()
+            deleted += 1
+        self.stdout.write(f'Удалено файлов: {deleted}')
+
+    def rebuild(self, directory, dry_run):
+        counts = Counter()
+        recipes = Recipe.objects.only('image', 'image_variants')
+        for recipe in recipes.iterator():
+            counts.update(media.recipe_files(recipe))
+        stored = {stored_file.name: stored_file
+                  for stored_file in StoredFile.objects.all()}
+        if default_storage.exists(directory):
+            for name in walk(directory):
+                if name not in stored and name not in counts:
+                    stored[name] = StoredFile(
+                        name=name,
+                        updated_at=default_storage.get_modified_time(name)
+                    )
+        for name in counts.keys() - stored.keys():
+            stored[name] = StoredFile(name=name, updated_at=timezone.now())
+        changed = []
+        for name, stored_file in stored.items():
+            references = counts[name]
+            if stored_file.pk is None or stored_file.references != references:
+                stored_file.references = references
+                changed.append(stored_file)
+        self.stdout.write(f'Исправлено счетчиков: {len(changed)}')
+        if dry_run:
+            return
+        StoredFile.objects.bulk_update(
+            [stored_file for stored_file in changed if stored_file.pk],
+            ['references']
+        )
+        StoredFile.objects.bulk_create(
+            [stored_file for stored_file in changed if not stored_file.pk]
+        )
@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import sys
+import time
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from api import media
+from api.models import Recipe, RecipeIngredient
+
+
+def iter_chunks(queryset, chunk_size):
+    """Рецепты пачками по возрастанию id. Django 3.2 не выполняет
+    prefetch_related вместе с iterator(), поэтому каждая пачка
+    выбирается отдельным запросом с пагинацией по ключу и подгружает
+    связи только для себя."""
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def to_record(recipe):
+    author = recipe.author
+    return {
+        'id': recipe.pk,
+        'author': {
+            'email': author.email,
+            'username': author.username,
+            'first_name': author.first_name,
+            'last_name': author.last_name,
+        },
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'image': recipe.image.name,
+        'image_variants': recipe.image_variants,
+        'tags': [
+            {'name': tag.name, 'color': tag.color, 'slug': tag.slug}
+            for tag in recipe.tags.all()
+        ],
+        'ingredients': [
+            {
+                'name': amount.ingredient.name,
+                'measurement_unit': amount.ingredient.measurement_unit,
+                'amount': amount.amount,
+            }
+            for amount in recipe.amounts.all()
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = ('Выгружает рецепты с ингредиентами и тегами в NDJSON, '
+            'по одной записи на строку, и копирует их изображения')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Файл NDJSON или - для stdout')
+        parser.add_argument(
+            '--media-dir',
+            help='Каталог, куда копировать изображения рецептов'
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        queryset = Recipe.objects.order_by('pk').defer(
+            'search_vector'
+        ).select_related('author').prefetch_related(
+            'tags',
+            Prefetch('amounts', queryset=RecipeIngredient.objects.
+                     select_related('ingredient').order_by('pk')),
+        )
+        output = (sys.stdout if options['output'] == '-'
+                  else open(options['output'], 'w', encoding='utf-8'))
+        started = time.monotonic()
+        exported = copied = 0
+        try:
+            for chunk in iter_chunks(queryset, options['chunk_size']):
+                for recipe in chunk:
+                    output.write(json.dumps(to_record(recipe),
+                                            ensure_ascii=False))
+                    output.write('\n')
+                    if options['media_dir']:
+                        copied += self.copy_files(recipe,
+                                                  options['media_dir'])
+                exported += len(chunk)
+                self.stderr.write(f'Выгружено рецептов: {exported}')
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        elapsed = time.monotonic() - started
+        self.stderr.write(
+            f'Выгружено рецептов: {exported}, скопировано файлов: '
+            f'{copied}; {elapsed:.1f} с, '
+            f'{exported / max(elapsed, 1e-6):.0f} рецептов/с'
+        )
+
+    def copy_files(self, recipe, media_dir):
+        copied = 0
+        for name in media.recipe_files(recipe) or ():
+            target = os.path.join(media_dir, name)
+            if os.path.exists(target) or not default_storage.exists(name):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with default_storage.open(name) as source:
+                with open(target, 'wb') as destination:
+                    shutil.copyfileobj(source, destination)
+            copied += 1
+        return copied
@@ -0,0 +1,250 @@
+import io
+import itertools
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from PIL import Image
+
+from api import bulk, images
+from api.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                        ShoppingCart, Subscription, Tag)
+
+User = get_user_model()
+
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+PASSWORD = 'foodgram-synthetic'
+WORDS = ('суп', 'салат', 'пирог', 'рагу', 'каша', 'паста', 'запеканка',
+         'котлеты', 'омлет', 'блины', 'плов', 'борщ', 'жаркое', 'соус')
+
+
+def zipf_weights(count, exponent):
+    """Накопленные веса закона Ципфа для random.choices: элемент с
+    рангом r выбирается с вероятностью, пропорциональной 1 / r^exponent."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)
+    ))
+
+
+def pick(rng, population, cum_weights, count):
+    """До count различных элементов, выбранных с весами."""
+    if not population:
+        return set()
+    count = min(count, len(population))
+    chosen = set()
+    for _ in range(count * 3):
+        chosen.update(rng.choices(population, cum_weights=cum_weights,
+                                  k=count - len(chosen)))
+        if len(chosen) >= count:
+            break
+    return chosen
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Генерирует детерминированный синтетический набор данных: '
+            'пользователей, рецепты, подписки, избранное и списки покупок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients', type=int, default=2000,
+                            help='Минимальный размер справочника')
+        parser.add_argument('--ingredients-per-recipe', type=int, nargs=2,
+                            default=(3, 15), metavar=('MIN', 'MAX'))
+        parser.add_argument('--subscriptions-per-user', type=int,
+                            default=20, help='Максимум подписок')
+        parser.add_argument('--favorites-per-user', type=int, default=30,
+                            help='Максимум рецептов в избранном')
+        parser.add_argument('--cart-size', type=int, default=5,
+                            help='Максимум рецептов в списке покупок')
+        parser.add_argument('--heavy-cart-share', type=float, default=0.01,
+                            help='Доля пользователей с большим списком')
+        parser.add_argument('--heavy-cart-size', type=int, default=200)
+        parser.add_argument('--author-exponent', type=float, default=1.1,
+                            help='Показатель степенного закона '
+                                 'популярности авторов и рецептов')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--prefix', default='synthetic',
+                            help='Префикс имен и адресов пользователей')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.started = time.monotonic()
+        try:
+            tags = self.get_tags()
+            ingredients = self.get_ingredients()
+            users = self.create_users()
+            authors = users[:]
+            self.rng.shuffle(authors)
+            recipes = self.create_recipes(authors, tags, ingredients)
+            self.create_relations(users, authors, recipes)
+        finally:
+            bulk.finish_bulk_load()
+        self.report('Готово')
+
+    def report(self, message):
+        self.stderr.write(
+            f'{message} ({time.monotonic() - self.started:.1f} с)'
+        )
+
+    def get_tags(self):
+        if not Tag.objects.exists():
+            bulk.get_tags({'name': name, 'color': color, 'slug': slug}
+                          for name, color, slug in DEFAULT_TAGS)
+        return list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+
+    def get_ingredients(self):
+        missing = self.options['ingredients'] - Ingredient.objects.count()
+        if missing > 0:
+            Ingredient.objects.bulk_create(
+                [Ingredient(name=f'ингредиент {self.options["prefix"]} '
+                                 f'{number}',
+                            measurement_unit=self.rng.choice(
+                                ('г', 'мл', 'шт.', 'ст. л.')
+                            ))
+                 for number in range(missing)],
+                batch_size=self.options['batch_size'],
+                ignore_conflicts=True
+            )
+        return list(Ingredient.objects.order_by('pk').values_list(
+            'pk', flat=True
+        ))
+
+    def create_users(self):
+        prefix = self.options['prefix']
+        password = make_password(PASSWORD)
+        emails = [f'{prefix}{number}@example.com'
+                  for number in range(self.options['users'])]
+        for batch in batched(enumerate(emails), self.options['batch_size']):
+            User.objects.bulk_create(
+                [User(email=email, username=f'{prefix}{number}',
+                      first_name=f'Имя {number}',
+                      last_name=f'Фамилия {number}', password=password)
+                 for number, email in batch],
+                ignore_conflicts=True
+            )
+        users = User.objects.in_bulk(emails, field_name='email')
+        self.report(f'Пользователей: {len(users)}')
+        return [users[email].pk for email in emails if email in users]
+
+    def get_image(self):
+        """Одно изображение-заглушка на все рецепты: хранилище адресует
+        файлы по содержимому, а копии строятся один раз."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (1280, 960), (226, 108, 45)).save(buffer, 'JPEG')
+        name = default_storage.save('recipes/synthetic.jpg',
+                                    ContentFile(buffer.getvalue()))
+        return name, images.build_variants(name)
+
+    def create_recipes(self, authors, tags, ingredients):
+        rng = self.rng
+        low, high = self.options['ingredients_per_recipe']
+        author_weights = zipf_weights(len(authors),
+                                      self.options['author_exponent'])
+        ingredient_weights = zipf_weights(len(ingredients), 1)
+        image, variants = self.get_image()
+        recipe_ids = []
+        for numbers in batched(range(self.options['recipes']),
+                               self.options['batch_size']):
+            recipes = []
+            for number in numbers:
+                recipe = Recipe(
+                    author_id=rng.choices(authors,
+                                          cum_weights=author_weights)[0],
+                    name=f'{rng.choice(WORDS).capitalize()} №{number}',
+                    text=' '.join(rng.choices(WORDS, k=40)),
+                    cooking_time=rng.randint(5, 180),
+                    image=image,
+                    image_variants=variants,
+                )
+                recipe_tags = rng.sample(tags, rng.randint(1, len(tags)))
+                recipe_ingredients = [
+                    (ingredient, rng.randint(1, 500))
+                    for ingredient in sorted(pick(rng, ingredients,
+                                                  ingredient_weights,
+                                                  rng.randint(low, high)))
+                ]
+                recipes.append((recipe, recipe_tags, recipe_ingredients))
+            with transaction.atomic():
+                bulk.save_recipes([recipe for recipe, _, _ in recipes])
+                Recipe.tags.through.objects.bulk_create([
+                    Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag)
+                    for recipe, recipe_tags, _ in recipes
+                    for tag in recipe_tags
+                ])
+                RecipeIngredient.objects.bulk_create([
+                    RecipeIngredient(recipe_id=recipe.pk,
+                                     ingredient_id=ingredient, amount=amount)
+                    for recipe, _, recipe_ingredients in recipes
+                    for ingredient, amount in recipe_ingredients
+                ])
+            recipe_ids.extend(recipe.pk for recipe, _, _ in recipes)
+            self.report(f'Рецептов: {len(recipe_ids)}')
+        return recipe_ids
+
+    def create_relations(self, users, authors, recipes):
+        """Подписки на популярных авторов, избранное и списки покупок с
+        популярными рецептами; немногие пользователи собирают большие
+        списки покупок."""
+        rng = self.rng
+        options = self.options
+        exponent = options['author_exponent']
+        author_weights = zipf_weights(len(authors), exponent)
+        popular = recipes[:]
+        rng.shuffle(popular)
+        recipe_weights = zipf_weights(len(popular), exponent)
+        created = 0
+        for batch in batched(users, options['batch_size']):
+            subscriptions, favorites, carts = [], [], []
+            for user in batch:
+                subscriptions.extend(
+                    Subscription(user_id=user, author_id=author)
+                    for author in pick(
+                        rng, authors, author_weights,
+                        rng.randint(0, options['subscriptions_per_user'])
+                    )
+                    if author != user
+                )
+                favorites.extend(
+                    Favorite(user_id=user, recipe_id=recipe)
+                    for recipe in pick(
+                        rng, popular, recipe_weights,
+                        rng.randint(0, options['favorites_per_user'])
+                    )
+                )
+                cart_size = (options['heavy_cart_size']
+                             if rng.random() < options['heavy_cart_share']
+                             else rng.randint(0, options['cart_size']))
+                carts.extend(
+                    ShoppingCart(user_id=user, recipe_id=recipe)
+                    for recipe in pick(rng, popular, recipe_weights,
+                                       cart_size)
+                )
+            with transaction.atomic():
+                for model, objects in ((Subscription, subscriptions),
+                                       (Favorite, favorites),
+                                       (ShoppingCart, carts)):
+                    model.objects.bulk_create(objects, ignore_conflicts=True)
+            created += len(batch)
+            self.report(f'Связи созданы для пользователей: {created}')
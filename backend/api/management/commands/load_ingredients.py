@@ -0,0 +1,179 @@
+import csv
+import json
+import os
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import ingredient_index, recipe_cache, versions
+from api.models import Ingredient
+
+FORMATS = ('json', 'ndjson', 'csv')
+CHUNK_SIZE = 64 * 1024
+SEPARATORS = re.compile(r'[\s,]*')
+DELIMITER = re.compile(r'\s*[,\]]')
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """Читает элементы JSON-массива по одному, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    while not buffer:
+        chunk = file.read(chunk_size)
+        buffer = chunk.lstrip()
+        if not chunk:
+            break
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив')
+    position, eof = 1, False
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            end = None
+        # Элемент завершен, только если за ним идет запятая или конец
+        # массива: число на границе блока ("2." из "2.5") иначе
+        # прочиталось бы не полностью.
+        if end is None or not DELIMITER.match(buffer, end):
+            if eof:
+                raise CommandError('Некорректный JSON')
+            chunk = file.read(chunk_size)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            continue
+        yield item
+        position = end
+
+
+def iter_ndjson(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_csv(file):
+    """Строки CSV с заголовком name,measurement_unit или без него."""
+    reader = csv.reader(file)
+    for row in reader:
+        if row and [cell.strip() for cell in row[:2]] == [
+            'name', 'measurement_unit'
+        ]:
+            continue
+        if len(row) >= 2:
+            yield {'name': row[0], 'measurement_unit': row[1]}
+        elif row:
+            yield {}
+
+
+READERS = {'json': iter_json_array, 'ndjson': iter_ndjson, 'csv': iter_csv}
+
+
+def to_fields(item):
+    """Поля ингредиента из записи каталога или фикстуры Django; для
+    записей других моделей возвращает None."""
+    if not isinstance(item, dict):
+        return None
+    if 'fields' in item:
+        if item.get('model', '').lower() != 'api.ingredient':
+            return None
+        item = item['fields']
+    return (str(item.get('name') or '').strip(),
+            str(item.get('measurement_unit') or '').strip())
+
+
+class Command(BaseCommand):
+    help = ('Загружает каталог ингредиентов из JSON, NDJSON или CSV '
+            'потоково, пачками, пропуская уже существующие пары '
+            '(name, measurement_unit)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='Формат файла; по умолчанию определяется по расширению'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--progress-every', type=int, default=50000,
+            help='Печатать прогресс через это число прочитанных записей'
+        )
+
+    def handle(self, *args, **options):
+        for option in ('batch_size', 'progress_every'):
+            if options[option] < 1:
+                raise CommandError(
+                    f'--{option.replace("_", "-")} должен быть не меньше 1'
+                )
+        file_format = options['format'] or self.guess_format(options['path'])
+        name_length = Ingredient._meta.get_field('name').max_length
+        unit_length = Ingredient._meta.get_field(
+            'measurement_unit'
+        ).max_length
+        before = Ingredient.objects.count()
+        started = time.monotonic()
+        read = invalid = skipped = 0
+        batch = set()
+        try:
+            with open(options['path'], encoding='utf-8-sig',
+                      newline='') as file:
+                for item in READERS[file_format](file):
+                    read += 1
+                    fields = to_fields(item)
+                    if fields is None:
+                        skipped += 1
+                    elif (not fields[0] or len(fields[0]) > name_length
+                          or len(fields[1]) > unit_length):
+                        invalid += 1
+                    else:
+                        batch.add(fields)
+                    if len(batch) >= options['batch_size']:
+                        self.write_batch(batch, options['batch_size'])
+                        batch = set()
+                    if read % options['progress_every'] == 0:
+                        self.report_progress(read, started)
+            self.write_batch(batch, options['batch_size'])
+        except (OSError, UnicodeDecodeError, json.JSONDecodeError,
+                csv.Error) as error:
+            raise CommandError(error)
+        finally:
+            self.invalidate()
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Прочитано записей: {read}, добавлено: '
+            f'{Ingredient.objects.count() - before}, '
+            f'некорректных: {invalid}, других моделей: {skipped}; '
+            f'{elapsed:.1f} с, {read / max(elapsed, 1e-6):.0f} записей/с'
+        )
+
+    def guess_format(self, path):
+        extension = os.path.splitext(path)[1].lstrip('.').lower()
+        if extension == 'jsonl':
+            extension = 'ndjson'
+        if extension not in FORMATS:
+            raise CommandError('Не удалось определить формат, '
+                               'укажите --format')
+        return extension
+
+    def write_batch(self, batch, batch_size):
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit=unit)
+             for name, unit in batch],
+            batch_size=batch_size, ignore_conflicts=True
+        )
+
+    def report_progress(self, read, started):
+        elapsed = time.monotonic() - started
+        self.stderr.write(
+            f'Прочитано {read} записей, '
+            f'{read / max(elapsed, 1e-6):.0f} записей/с'
+        )
+
+    def invalidate(self):
+        # bulk_create не отправляет сигналы, поэтому кэши справочника
+        # сбрасываются здесь.
+        versions.bump_model_version(Ingredient)
+        ingredient_index.invalidate()
+        recipe_cache.bump_list_generation()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import counters
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает денормализованные счетчики избранного, '
+            'списков покупок, рецептов и подписчиков')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = counters.rebuild()
+        for counter, count in fixed.items():
+            self.stdout.write(f'{counter}: исправлено записей {count}')
@@ -0,0 +1,50 @@
+from collections import Counter, defaultdict
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import StoredFile
+
+
+def recipe_files(recipe):
+    """Множество файлов хранилища, на которые ссылается рецепт: исходное
+    изображение и его актуальные уменьшенные копии. None, если поля
+    изображения не загружены из базы."""
+    if {'image', 'image_variants'} & recipe.get_deferred_fields():
+        return None
+    names = set()
+    if not recipe.image:
+        return names
+    names.add(recipe.image.name)
+    variants = recipe.image_variants or {}
+    if variants.get('source') == recipe.image.name:
+        for value in variants.values():
+            if isinstance(value, dict):
+                names.update(value.values())
+    return names
+
+
+def add_references(names):
+    """Добавляет по ссылке на каждое вхождение имени в names."""
+    counts = Counter(names)
+    if not counts:
+        return
+    StoredFile.objects.bulk_create(
+        [StoredFile(name=name) for name in counts], ignore_conflicts=True
+    )
+    groups = defaultdict(list)
+    for name, count in counts.items():
+        groups[count].append(name)
+    for count, group in groups.items():
+        StoredFile.objects.filter(name__in=group).update(
+            references=F('references') + count, updated_at=timezone.now()
+        )
+
+
+def remove_references(names):
+    names = set(names)
+    if not names:
+        return
+    StoredFile.objects.filter(name__in=names).update(
+        references=F('references') - 1, updated_at=timezone.now()
+    )
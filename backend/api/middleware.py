@@ -0,0 +1,183 @@
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from rest_framework.serializers import BaseSerializer
+
+from . import metrics, profiling
+from .queries import QueryLimitExceeded, RequestTiming, capture, find_problems
+
+logger = logging.getLogger(__name__)
+
+current_timing = ContextVar('current_timing', default=None)
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_PARAMETER = 'profile'
+
+
+def install_serializer_timer():
+    """Оборачивает BaseSerializer.data, чтобы время сериализации
+    попадало в замер текущего запроса. Вызовы .data изнутри другого
+    сериализатора (например, RecipeWriteSerializer.to_representation)
+    уже входят во внешний замер и отдельно не считаются."""
+    data = BaseSerializer.data
+    if getattr(data.fget, 'timed', False):
+        return
+
+    def timed_data(serializer):
+        timing = current_timing.get()
+        if timing is None or timing.serializing:
+            return data.fget(serializer)
+        timing.serializing = True
+        started = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            timing.serializing = False
+            timing.serializer += time.perf_counter() - started
+
+    timed_data.timed = True
+    BaseSerializer.data = property(timed_data)
+
+
+class QueryTimingMiddleware:
+    """Замеряет SQL-запросы и сериализацию для доли запросов
+    SQL_TIMING_SAMPLE_RATE и отдает итог в заголовке Server-Timing и
+    структурированной строке лога; при нулевой доле отключается."""
+
+    def __init__(self, get_response):
+        self.sample_rate = settings.SQL_TIMING_SAMPLE_RATE
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        install_serializer_timer()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        timing = RequestTiming()
+        token = current_timing.set(timing)
+        started = time.perf_counter()
+        try:
+            with capture(timing):
+                response = self.get_response(request)
+        finally:
+            current_timing.reset(token)
+        self.report(request, response, timing,
+                    time.perf_counter() - started)
+        return response
+
+    def report(self, request, response, timing, total):
+        view = getattr(request.resolver_match, 'view_name', None)
+        slowest = timing.slowest(settings.SQL_TIMING_SLOWEST)
+        duplicates = timing.duplicates(settings.SQL_TIMING_DUPLICATES)
+        metrics = [
+            f'app;dur={total * 1000:.1f}',
+            f'db;dur={timing.db * 1000:.1f};desc="{len(timing.queries)} SQL"',
+            f'serializer;dur={timing.serializer * 1000:.1f}',
+        ]
+        if slowest:
+            metrics.append(f'db-slowest;dur={slowest[0][1] * 1000:.1f}')
+        if duplicates:
+            metrics.append(f'db-duplicates;desc="{len(duplicates)}"')
+        response['Server-Timing'] = ', '.join(metrics)
+        logger.info(json.dumps({
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 1),
+            'queries': len(timing.queries),
+            'db_ms': round(timing.db * 1000, 1),
+            'serializer_ms': round(timing.serializer * 1000, 1),
+            'slowest': [{'sql': sql, 'ms': round(duration * 1000, 1)}
+                        for sql, duration in slowest],
+            'duplicates': [{'sql': shape, 'count': count}
+                           for shape, count in duplicates],
+        }, ensure_ascii=False))
+        for shape, count in duplicates:
+            logger.warning('Похоже на N+1 в %s: запрос повторен %s раз: %s',
+                           view, count, shape)
+
+
+class MetricsMiddleware:
+    """Пишет в метрики Prometheus время ответа, число и время
+    SQL-запросов и размер ответа по имени маршрута DRF
+    (например, recipes-download-shopping-cart)."""
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        started = time.perf_counter()
+        with metrics.REQUESTS_IN_FLIGHT.track_inprogress():
+            with capture(timing):
+                response = self.get_response(request)
+        view = getattr(request.resolver_match, 'view_name', None) or 'none'
+        metrics.REQUEST_DURATION.labels(
+            view, request.method, response.status_code
+        ).observe(time.perf_counter() - started)
+        metrics.REQUEST_QUERIES.labels(view).observe(len(timing.queries))
+        metrics.REQUEST_DB_DURATION.labels(view).observe(timing.db)
+        if response.has_header('Content-Length'):
+            size = int(response['Content-Length'])
+        elif not response.streaming:
+            size = len(response.content)
+        else:
+            size = None
+        if size is not None:
+            metrics.RESPONSE_SIZE.labels(view).observe(size)
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует отдельный запрос сотрудника, пришедший с заголовком
+    X-Profile или параметром ?profile; остальным запросам стоит одной
+    проверки заголовка и параметра."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if ((PROFILE_HEADER in request.META
+                or PROFILE_PARAMETER in request.GET)
+                and profiling.is_staff(request)):
+            return profiling.profile(self.get_response, request)
+        return self.get_response(request)
+
+
+class NPlusOneMiddleware:
+    """Для разработки: проверяет каждый запрос и предупреждает в лог
+    или, при N_PLUS_ONE_RAISE, падает с QueryLimitExceeded, если SQL
+    одной формы повторился больше N_PLUS_ONE_THRESHOLD раз."""
+
+    def __init__(self, get_response):
+        self.threshold = settings.N_PLUS_ONE_THRESHOLD
+        if self.threshold <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = RequestTiming()
+        with capture(timing):
+            response = self.get_response(request)
+        problems = find_problems(timing, repeats=self.threshold)
+        if problems:
+            view = getattr(request.resolver_match, 'view_name', None)
+            message = f'N+1 в {view} ({request.path}):\n' + '\n'.join(
+                problems
+            )
+            if settings.N_PLUS_ONE_RAISE:
+                raise QueryLimitExceeded(message)
+            logger.warning(message)
+        return response
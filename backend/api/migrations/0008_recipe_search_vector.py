@@ -0,0 +1,65 @@
+# Generated by Django 3.2.12 on 2026-10-18 17:20
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+CREATE_SEARCH_OBJECTS = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm;',
+    """
+    CREATE FUNCTION api_recipe_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('pg_catalog.russian',
+                                  coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('pg_catalog.russian',
+                                  coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER api_recipe_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, text ON api_recipe
+    FOR EACH ROW EXECUTE PROCEDURE api_recipe_search_vector_update();
+    """,
+    'UPDATE api_recipe SET name = name;',
+    'CREATE INDEX api_recipe_search_vector_gin ON api_recipe '
+    'USING gin (search_vector);',
+    'CREATE INDEX api_recipe_name_trgm_gin ON api_recipe '
+    'USING gin (name gin_trgm_ops);',
+]
+
+DROP_SEARCH_OBJECTS = [
+    'DROP INDEX IF EXISTS api_recipe_name_trgm_gin;',
+    'DROP INDEX IF EXISTS api_recipe_search_vector_gin;',
+    'DROP TRIGGER IF EXISTS api_recipe_search_vector_trigger ON api_recipe;',
+    'DROP FUNCTION IF EXISTS api_recipe_search_vector_update();',
+]
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_auto_20210920_1730'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            run_on_postgresql(CREATE_SEARCH_OBJECTS),
+            run_on_postgresql(DROP_SEARCH_OBJECTS),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 3.2.12 on 2026-10-18 17:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('api.Recipe', 'favorites_count', 'api.Favorite', 'recipe'),
+    ('api.Recipe', 'in_carts_count', 'api.ShoppingCart', 'recipe'),
+    ('users.CustomUser', 'recipes_count', 'api.Recipe', 'author'),
+    ('users.CustomUser', 'subscribers_count', 'api.Subscription', 'author'),
+)
+
+
+def rebuild_counters(apps, schema_editor):
+    for target, field, source, foreign_key in COUNTERS:
+        actual = Coalesce(Subquery(
+            apps.get_model(source).objects.filter(
+                **{foreign_key: OuterRef('pk')}
+            ).order_by().values(foreign_key).annotate(
+                total=Count('pk')
+            ).values('total')
+        ), Value(0))
+        apps.get_model(target).objects.update(**{field: actual})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_storedfile'),
+        ('users', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(rebuild_counters, migrations.RunPython.noop),
+    ]
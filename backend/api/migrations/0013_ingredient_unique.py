@@ -0,0 +1,55 @@
+# Generated by Django 3.2.12 on 2026-10-18 17:37
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Сводит повторы (name, measurement_unit) к ингредиенту с
+    наименьшим id, складывая количества в рецептах, где встречались
+    оба варианта."""
+    Ingredient = apps.get_model('api', 'Ingredient')
+    RecipeIngredient = apps.get_model('api', 'RecipeIngredient')
+    Recipe = apps.get_model('api', 'Recipe')
+    RecipeIngredients = Recipe.ingredients.through
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(keep=Min('id'), total=Count('id')).filter(total__gt=1)
+    for duplicate in duplicates:
+        keep = duplicate.pop('keep')
+        duplicate.pop('total')
+        others = Ingredient.objects.filter(**duplicate).exclude(pk=keep)
+        for amount in RecipeIngredient.objects.filter(ingredient__in=others):
+            kept = RecipeIngredient.objects.filter(
+                recipe_id=amount.recipe_id, ingredient_id=keep
+            ).first()
+            if kept is None:
+                amount.ingredient_id = keep
+                amount.save()
+            else:
+                kept.amount += amount.amount
+                kept.save()
+                amount.delete()
+        links = RecipeIngredients.objects.filter(ingredient__in=others)
+        RecipeIngredients.objects.bulk_create([
+            RecipeIngredients(recipe_id=recipe_id, ingredient_id=keep)
+            for recipe_id in links.values_list('recipe_id', flat=True)
+        ], ignore_conflicts=True)
+        links.delete()
+        others.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_ingredients,
+                             migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='ingredient_unique'),
+        ),
+    ]
@@ -1,4 +1,6 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 
 from users.models import CustomUser
 
@@ -25,6 +27,10 @@ class Ingredient(models.Model):
                                         max_length=32)
 
     class Meta:
+        constraints = [models.UniqueConstraint(
+            fields=['name', 'measurement_unit'],
+            name='ingredient_unique'
+        )]
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name',)
@@ -46,11 +52,22 @@ class Recipe(models.Model):
                                   related_name='tags_recipes')
     image = models.ImageField(verbose_name='Изображение',
                               upload_to='recipes/')
+    image_variants = models.JSONField(verbose_name='Варианты изображения',
+                                      default=dict, blank=True,
+                                      editable=False)
     name = models.CharField(verbose_name='Название', max_length=200)
     text = models.TextField(verbose_name='Описание')
     cooking_time = models.PositiveIntegerField(
         verbose_name='Время приготовления (в минутах)'
     )
+    search_vector = SearchVectorField(verbose_name='Поисковый вектор',
+                                      null=True, editable=False)
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном', default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок', default=0, editable=False
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -106,3 +123,18 @@ class Favorite(models.Model):
     class Meta:
         constraints = [models.UniqueConstraint(fields=['recipe', 'user'],
                                                name='favorite_recipe_unique')]
+
+
+class StoredFile(models.Model):
+    name = models.CharField(verbose_name='Путь', max_length=255, unique=True)
+    references = models.IntegerField(verbose_name='Количество ссылок',
+                                     default=0)
+    updated_at = models.DateTimeField(verbose_name='Изменен',
+                                      default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Файл'
+        verbose_name_plural = 'Файлы'
+
+    def __str__(self) -> str:
+        return self.name
@@ -1,5 +1,158 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """Оценка числа строк по плану запроса PostgreSQL без выполнения
+    COUNT(*); на других СУБД возвращает точное значение."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class CursorPaginatorModified(CursorPagination):
+    """Курсор идет в том же порядке, что и queryset, чтобы оба режима
+    пагинации отдавали записи одинаково. Курсор строится только по id:
+    сортировку по релевантности поиска он сохранить не может."""
+    ordering = '-id'
+    page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = tuple(queryset.query.order_by)
+        if not ordering:
+            return (self.ordering,)
+        if ordering in (('id',), ('pk',)):
+            return ('id',)
+        if ordering in (('-id',), ('-pk',)):
+            return ('-id',)
+        raise ValidationError({
+            'cursor': 'Курсорная пагинация доступна только для выдачи, '
+                      'упорядоченной по id, и недоступна вместе с search.'
+        })
 
 
 class PageNumberPaginatorModified(PageNumberPagination):
+    """Постраничная пагинация page/limit с двумя необязательными режимами:
+
+    - ?cursor= (пустое значение для первой страницы) включает курсорную
+      пагинацию по id в порядке выдачи: без COUNT(*) и OFFSET, с
+      непрозрачными курсорами в next/previous;
+    - ?count=approximate заменяет точный COUNT(*) оценкой планировщика,
+      в курсорном режиме добавляет эту оценку в ответ. Оценка идет
+      только в поле count: границы страницы определяются выборкой
+      limit + 1 строк, иначе неточная оценка обрезала бы последнюю
+      страницу или давала ссылки на пустые.
+    """
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        self.approximate_page = None
+        approximate = (
+            request.query_params.get(self.count_query_param) == 'approximate'
+        )
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = CursorPaginatorModified()
+            self.approximate_count = (
+                estimate_count(queryset) if approximate else None
+            )
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        if approximate:
+            return self.paginate_approximately(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_approximately(self, queryset, request):
+        page_size = self.get_page_size(request)
+        page_number = request.query_params.get(self.page_query_param, 1)
+        try:
+            number = int(page_number)
+        except ValueError:
+            number = 0
+        offset = (number - 1) * page_size
+        rows = []
+        if number > 0:
+            rows = list(queryset[offset:offset + page_size + 1])
+        if number < 1 or (number > 1 and not rows):
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=''
+            ))
+        self.request = request
+        self.approximate_page = (number, len(rows) > page_size)
+        rows = rows[:page_size]
+        # Оценка не может быть меньше уже увиденных строк.
+        self.approximate_count = max(estimate_count(queryset),
+                                     offset + len(rows))
+        return rows
+
+    def get_approximate_links(self):
+        number, has_next = self.approximate_page
+        url = self.request.build_absolute_uri()
+        next_link = (replace_query_param(url, self.page_query_param,
+                                         number + 1)
+                     if has_next else None)
+        if number == 1:
+            previous_link = None
+        elif number == 2:
+            previous_link = remove_query_param(url, self.page_query_param)
+        else:
+            previous_link = replace_query_param(url, self.page_query_param,
+                                                number - 1)
+        return next_link, previous_link
+
+    def get_paginated_response(self, data):
+        if self.approximate_page is not None:
+            next_link, previous_link = self.get_approximate_links()
+            return Response(OrderedDict([
+                ('count', self.approximate_count),
+                ('next', next_link),
+                ('previous', previous_link),
+                ('results', data),
+            ]))
+        if self.cursor_paginator is None:
+            return super().get_paginated_response(data)
+        response = self.cursor_paginator.get_paginated_response(data)
+        if self.approximate_count is not None:
+            response.data['count'] = self.approximate_count
+            response.data.move_to_end('count', last=False)
+        return response
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Курсор; пустое значение включает курсорную '
+                               'пагинацию с первой страницы.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'approximate - оценка общего количества.',
+                'schema': {'type': 'string', 'enum': ['approximate']},
+            },
+        ]
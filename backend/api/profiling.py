@@ -0,0 +1,114 @@
+import cProfile
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+UNSAFE_NAME_CHARACTERS = re.compile(r'[^\w-]+')
+
+
+def is_staff(request):
+    """Сотрудник ли автор запроса: по сессии или по токену API, который
+    проверяется так же, как в представлениях DRF."""
+    if request.user.is_staff:
+        return True
+    authenticators = [authentication() for authentication
+                      in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    try:
+        return Request(request, authenticators=authenticators).user.is_staff
+    except APIException:
+        return False
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})'
+
+
+class StackSampler(threading.Thread):
+    """Снимает стек потока запроса раз в interval секунд и считает
+    одинаковые стеки; стек обрезается на кадре root."""
+
+    def __init__(self, root, interval):
+        super().__init__(daemon=True)
+        self.root = root
+        self.thread_id = threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def profile(get_response, request):
+    """Выполняет запрос под cProfile и сэмплером стеков и сохраняет
+    pstats и свернутые стеки для flamegraph; имя файлов возвращается
+    в заголовке X-Profile-Id."""
+    sampler = StackSampler(sys._getframe(), settings.PROFILING_INTERVAL)
+    profiler = cProfile.Profile()
+    sampler.start()
+    profiler.enable()
+    try:
+        response = get_response(request)
+    finally:
+        profiler.disable()
+        sampler.stop()
+    view = getattr(request.resolver_match, 'view_name', None) or 'none'
+    response['X-Profile-Id'] = save(view, profiler, sampler.stacks)
+    return response
+
+
+def save(view, profiler, stacks):
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    name = '{}-{}-{}'.format(
+        time.strftime('%Y%m%d-%H%M%S'), uuid.uuid4().hex[:8],
+        UNSAFE_NAME_CHARACTERS.sub('_', view)
+    )
+    path = os.path.join(directory, name)
+    profiler.dump_stats(path + '.prof')
+    with open(path + '.collapsed', 'w') as file:
+        for stack, count in stacks.most_common():
+            file.write(f'{stack} {count}\n')
+    prune(directory, settings.PROFILING_KEEP)
+    return name
+
+
+def prune(directory, keep):
+    """Оставляет keep последних профилей, удаляя самые старые."""
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.prof'):
+            try:
+                profiles.append((entry.stat().st_mtime, entry.name))
+            except FileNotFoundError:
+                continue
+    profiles.sort()
+    for mtime, name in profiles[:max(len(profiles) - keep, 0)]:
+        base = os.path.join(directory, name[:-len('.prof')])
+        for suffix in ('.prof', '.collapsed'):
+            try:
+                os.remove(base + suffix)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,96 @@
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+SQL_PLACEHOLDER_LISTS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SQL_WHITESPACE = re.compile(r'\s+')
+
+
+class QueryLimitExceeded(AssertionError):
+    pass
+
+
+def normalize_sql(sql):
+    """Форма запроса без значений: литералы и списки параметров
+    заменены, так что запросы, отличающиеся только id, совпадают."""
+    sql = SQL_PLACEHOLDER_LISTS.sub('(...)', sql)
+    sql = SQL_LITERALS.sub('?', sql)
+    return SQL_WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestTiming:
+    """Запросы к базе и время сериализации одного HTTP-запроса;
+    экземпляр служит и обработчиком connection.execute_wrapper."""
+
+    def __init__(self):
+        self.queries = []
+        self.serializer = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - started))
+
+    @property
+    def db(self):
+        return sum(duration for sql, duration in self.queries)
+
+    def slowest(self, count):
+        return sorted(self.queries, key=lambda query: query[1],
+                      reverse=True)[:count]
+
+    def duplicates(self, threshold):
+        shapes = Counter(normalize_sql(sql) for sql, duration in self.queries)
+        return [(shape, count) for shape, count in shapes.most_common()
+                if count > threshold]
+
+
+@contextmanager
+def capture(timing, using=None):
+    """Записывает в timing запросы ко всем базам или только к using."""
+    with ExitStack() as stack:
+        for connection in (connections.all() if using is None
+                           else [connections[using]]):
+            stack.enter_context(connection.execute_wrapper(timing))
+        yield timing
+
+
+def find_problems(timing, count=None, repeats=None):
+    problems = []
+    if count is not None and len(timing.queries) > count:
+        problems.append(
+            f'Выполнено {len(timing.queries)} SQL-запросов, '
+            f'допустимо {count}'
+        )
+    if repeats is not None:
+        problems.extend(
+            f'Запрос повторен {times} раз, допустимо {repeats}: {shape}'
+            for shape, times in timing.duplicates(repeats)
+        )
+    return problems
+
+
+@contextmanager
+def max_queries(count=None, repeats=None, using=None):
+    """Падает с QueryLimitExceeded, если в блоке выполнено больше count
+    запросов или запрос одной формы повторен больше repeats раз, что
+    обычно означает N+1 в сериализаторе:
+
+        with max_queries(5, repeats=1):
+            RecipeReadSerializer(recipes, many=True, context=...).data
+
+    Работает и как декоратор.
+    """
+    timing = RequestTiming()
+    with capture(timing, using):
+        yield timing
+    problems = find_problems(timing, count, repeats)
+    if problems:
+        raise QueryLimitExceeded('\n'.join(problems))
@@ -0,0 +1,125 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics, versions
+from .models import Favorite, Ingredient, ShoppingCart, Subscription, Tag
+
+LIST_GENERATION_KEY = 'recipe_list_generation'
+LIST_PAGE_KEY = 'recipe_list_page:{}:{}'
+BODY_KEY = 'recipe_body:{}:{}'
+VIEWER_IDS_KEY = 'recipe_viewer_ids:{}:{}:{}'
+VIEWER_SOURCES = {
+    'favorites': (versions.FAVORITE_VERSION_KEY, Favorite, 'recipe_id'),
+    'cart': (versions.CART_VERSION_KEY, ShoppingCart, 'recipe_id'),
+    'following': (versions.SUBSCRIPTION_VERSION_KEY, Subscription,
+                  'author_id'),
+}
+
+
+def get_list_page_key(request):
+    """Ключ страницы списка: поколение кэша, хост (ссылки next/previous
+    абсолютные) и нормализованная строка запроса - параметры и их
+    значения отсортированы, так что ?tags=a&tags=b и ?tags=b&tags=a
+    попадают в одну запись."""
+    query = sorted(
+        (key, sorted(values)) for key, values in request.GET.lists()
+    )
+    digest = hashlib.md5(
+        repr((request.get_host(), request.path, query)).encode()
+    ).hexdigest()
+    return LIST_PAGE_KEY.format(
+        versions.get_version(LIST_GENERATION_KEY), digest
+    )
+
+
+def get_list_page(request):
+    data = cache.get(get_list_page_key(request))
+    metrics.count_cache('recipe_list', data is not None, data is None)
+    return data
+
+
+def set_list_page(request, data):
+    cache.set(get_list_page_key(request), data,
+              settings.RECIPE_LIST_CACHE_TIMEOUT)
+
+
+def bump_list_generation():
+    versions.bump_versions([LIST_GENERATION_KEY])
+
+
+def get_body_keys(recipe_ids, request):
+    """Ключи общих для всех пользователей представлений рецептов.
+
+    Версия записи складывается из версии самого рецепта и версий
+    тегов и ингредиентов; изменение данных автора сдвигает версии его
+    рецептов. В ключ входит и адрес сайта, так как ссылки на
+    изображения абсолютные.
+    """
+    shared = (
+        request.build_absolute_uri('/'),
+        versions.get_model_version(Tag),
+        versions.get_model_version(Ingredient),
+    )
+    return {
+        pk: BODY_KEY.format(pk, hashlib.md5(
+            repr((shared, version)).encode()
+        ).hexdigest())
+        for pk, version in versions.get_recipe_versions(recipe_ids).items()
+    }
+
+
+def get_bodies(recipe_ids, request, load):
+    """Возвращает представления рецептов в порядке recipe_ids.
+
+    Недостающие в кэше строятся вызовом load(ids), который должен
+    вернуть их сериализованные данные; удаленные за это время рецепты
+    пропускаются.
+    """
+    keys = get_body_keys(recipe_ids, request)
+    bodies = cache.get_many(keys.values())
+    missing = [pk for pk in recipe_ids if keys[pk] not in bodies]
+    metrics.count_cache('recipe_body', len(keys) - len(missing), len(missing))
+    if missing:
+        loaded = {keys[item['id']]: item for item in load(missing)}
+        cache.set_many(loaded, settings.RECIPE_CACHE_TIMEOUT)
+        bodies.update(loaded)
+    return [bodies[keys[pk]] for pk in recipe_ids if keys[pk] in bodies]
+
+
+def get_viewer_ids(user):
+    """Множества id рецептов в избранном и корзине пользователя и id
+    авторов, на которых он подписан; у анонима все множества пусты."""
+    if not user.is_authenticated:
+        return {name: frozenset() for name in VIEWER_SOURCES}
+    version_keys = {name: key.format(user.pk)
+                    for name, (key, model, field) in VIEWER_SOURCES.items()}
+    current = versions.get_versions(version_keys.values())
+    keys = {
+        name: VIEWER_IDS_KEY.format(name, user.pk, current[version_key])
+        for name, version_key in version_keys.items()
+    }
+    found = cache.get_many(keys.values())
+    viewer_ids = {}
+    for name, key in keys.items():
+        if key not in found:
+            version_key, model, field = VIEWER_SOURCES[name]
+            found[key] = frozenset(model.objects.filter(
+                user=user
+            ).values_list(field, flat=True))
+            cache.set(key, found[key], settings.RECIPE_CACHE_TIMEOUT)
+        viewer_ids[name] = found[key]
+    return viewer_ids
+
+
+def apply_viewer_ids(body, viewer_ids):
+    """Дополняет общее представление рецепта флагами пользователя."""
+    data = dict(body)
+    data['author'] = dict(
+        body['author'],
+        is_subscribed=body['author']['id'] in viewer_ids['following'],
+    )
+    data['is_favorited'] = body['id'] in viewer_ids['favorites']
+    data['is_in_shopping_cart'] = body['id'] in viewer_ids['cart']
+    return data
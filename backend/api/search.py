@@ -0,0 +1,65 @@
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.db import connections
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+SEARCH_CONFIG = 'russian'
+
+
+def search_recipes(queryset, query):
+    """Фильтрует рецепты по тексту запроса и сортирует по релевантности.
+
+    На PostgreSQL используется полнотекстовый поиск по search_vector
+    (название с весом A, описание с весом B) и триграммное сходство
+    названия, на остальных СУБД - поиск по вхождению слов, который лишь
+    приближает его: без словоформ, опечаток и весов ts_rank.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        return postgres_search(queryset, query)
+    return simple_search(queryset, query)
+
+
+def postgres_search(queryset, query):
+    search_query = SearchQuery(query, config=SEARCH_CONFIG,
+                               search_type='websearch')
+    return queryset.filter(
+        Q(search_vector=search_query) | Q(name__trigram_similar=query)
+    ).annotate(
+        # Рецепты, найденные только по триграммам, без сходства имели бы
+        # нулевой ранг и шли бы просто по id.
+        rank=(SearchRank(F('search_vector'), search_query)
+              + TrigramSimilarity('name', query))
+    ).order_by('-rank', '-id')
+
+
+def stem(word):
+    return word[:max(4, len(word) - 2)]
+
+
+def contains(field, term):
+    # LIKE в SQLite не учитывает регистр только для ASCII, поэтому
+    # кириллица ищется в строчном, прописном и заглавном написании.
+    condition = Q()
+    for variant in {term, term.capitalize(), term.upper()}:
+        condition |= Q(**{f'{field}__icontains': variant})
+    return condition
+
+
+def simple_search(queryset, query):
+    """Упрощенный поиск для остальных СУБД: начало каждого слова (без
+    двух последних букв) должно входить в название или описание, выше
+    те, где больше слов в названии. Результаты могут отличаться от
+    PostgreSQL: стоп-слова не отбрасываются, а опечатки не находятся."""
+    condition = Q()
+    rank = Value(0, output_field=IntegerField())
+    for term in (stem(word) for word in query.casefold().split()):
+        in_name = contains('name', term)
+        condition &= in_name | contains('text', term)
+        rank = rank + Case(When(in_name, then=Value(1)), default=Value(0),
+                           output_field=IntegerField())
+    return queryset.filter(condition).annotate(
+        rank=rank
+    ).order_by('-rank', '-id')
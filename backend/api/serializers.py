@@ -1,11 +1,19 @@
+import json
+
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import QueryDict
+
 from rest_framework import serializers
-from rest_framework.generics import get_object_or_404
 
-from .fields import Base64ImageField
+from . import recipe_cache, versions
+from .fields import Base64ImageField, ImageVariantsField
 from .models import Ingredient, Recipe, RecipeIngredient, Subscription, Tag
 from users.models import CustomUser
 from users.serializers import UserSerializer
 
+RECIPES_LIMIT_DEFAULT = 10
+
 
 class RecipeSerializer(serializers.ModelSerializer):
     image = serializers.ImageField(
@@ -13,10 +21,11 @@ class RecipeSerializer(serializers.ModelSerializer):
         allow_empty_file=False,
         use_url=True,
     )
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class ShowFollowersSerializer(serializers.ModelSerializer):
@@ -31,8 +40,7 @@ class ShowFollowersSerializer(serializers.ModelSerializer):
                   'last_name', 'is_subscribed', 'recipes', 'recipes_count')
 
     def count_author_recipes(self, user):
-        count_author = user.recipes.all()
-        return count_author.count()
+        return user.recipes_count
 
     def check_if_subscribed(self, user):
         current_user = self.context.get('current_user')
@@ -97,20 +105,25 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'author', 'name', 'text', 'image',
+        fields = ('id', 'author', 'name', 'text', 'image', 'image_variants',
                   'ingredients', 'tags', 'cooking_time',
                   'is_favorited', 'is_in_shopping_cart')
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
         return obj.favorite_recipe.filter(user=user).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
@@ -133,30 +146,32 @@ class SubscribeSerializer(UserSerializer):
         }
 
     def get_recipes(self, obj):
-        limit = 10
-        try:
-            limit = self.context['request'].query_params['recipes_limit']
-        except ValueError:
-            self.fail('limit is exhausted')
-        queryset = obj.author_recipes.all()[:int(limit)]
+        if hasattr(obj, 'limited_recipes'):
+            queryset = obj.limited_recipes
+        else:
+            limit = self.context.get('recipes_limit', RECIPES_LIMIT_DEFAULT)
+            queryset = obj.author_recipes.order_by('-id')[:limit]
         serializer = RecipeSerializer(queryset, many=True)
         return serializer.data
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
         return obj.subscriber.filter(user=user).exists()
 
     def get_recipes_count(self, obj):
-        return obj.author_recipes.all().count()
+        return obj.recipes_count
 
 
 class FavouriteSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
@@ -172,7 +187,32 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         fields = ('id', 'author', 'name', 'text', 'image',
                   'ingredients', 'tags', 'cooking_time')
 
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = self.parse_form_data(data)
+        return super().to_internal_value(data)
+
+    @staticmethod
+    def parse_form_data(data):
+        """Для multipart/form-data: теги передаются повторяющимся полем
+        tags, ингредиенты - JSON-строкой в поле ingredients."""
+        parsed = {key: data.get(key) for key in data}
+        if 'tags' in data:
+            parsed['tags'] = data.getlist('tags')
+        if isinstance(parsed.get('ingredients'), str):
+            try:
+                parsed['ingredients'] = json.loads(parsed['ingredients'])
+            except ValueError:
+                raise serializers.ValidationError({
+                    'ingredients': ['Ожидается JSON-список ингредиентов']
+                })
+        return parsed
+
     def validate_ingredients(self, data):
+        if not data:
+            raise serializers.ValidationError(
+                'В рецепте должны быть ингредиенты!'
+            )
         ingredients_set = set()
         for item in data:
             amount = item.get('amount')
@@ -185,27 +225,33 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     'Ингредиент в рецепте не должен повторяться.'
                 )
-            ingredients = item.get('ingredients')
-            if not ingredients:
-                raise serializers.ValidationError(
-                    'В рецепте должны быть ингредиенты!'
-                )
             ingredients_set.add(identifier)
+        ingredients = Ingredient.objects.in_bulk(ingredients_set)
+        missing = ingredients_set - ingredients.keys()
+        if missing:
+            raise serializers.ValidationError(
+                'Ингредиенты не найдены: {}'.format(
+                    ', '.join(str(identifier)
+                              for identifier in sorted(missing))
+                )
+            )
+        for item in data:
+            item['ingredient'] = ingredients[item['id']]
         return data
 
     @staticmethod
     def data_collection(recipe, ingredients_data, tags_data):
-        for ingredient in ingredients_data:
-            amount = ingredient['amount']
-            id = ingredient['id']
-            RecipeIngredient.objects.create(
-                ingredient=get_object_or_404(Ingredient, id=id),
-                recipe=recipe, amount=amount
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredient['ingredient'],
+                amount=ingredient['amount']
             )
-        recipe.tags.clear()
-        for tag in tags_data:
-            recipe.tags.add(tag)
+            for ingredient in ingredients_data
+        )
+        recipe.tags.set(tags_data)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop('ingredients')
         tags_data = validated_data.pop('tags')
@@ -217,24 +263,64 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         )
         return recipe
 
-    def update(self, instance, validated_data):
-        ingredients_data = validated_data.pop('ingredients')
-        tags_data = validated_data.pop('tags')
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.image = validated_data.get('image', instance.image)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time
-        )
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        RecipeWriteSerializer.data_collection(
-            recipe=instance,
-            ingredients_data=ingredients_data,
-            tags_data=tags_data
+    @staticmethod
+    def update_ingredients(recipe, ingredients_data):
+        current = {amount.ingredient_id: amount
+                   for amount in recipe.amounts.all()}
+        incoming = {item['id']: item for item in ingredients_data}
+        removed = current.keys() - incoming.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for identifier in current.keys() & incoming.keys():
+            amount = current[identifier]
+            if amount.amount != incoming[identifier]['amount']:
+                amount.amount = incoming[identifier]['amount']
+                changed.append(amount)
+        added = incoming.keys() - current.keys()
+        RecipeIngredient.objects.bulk_update(changed, ['amount'])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=incoming[identifier]['ingredient'],
+                amount=incoming[identifier]['amount']
+            )
+            for identifier in added
         )
+        # bulk_update и bulk_create не отправляют сигналы, поэтому
+        # версии, которые сбрасывают обработчики RecipeIngredient,
+        # сбрасываются здесь.
+        if changed or added:
+            versions.bump_recipe_versions([recipe.pk])
+            versions.bump_recipe_carts_versions([recipe.pk])
+            recipe_cache.bump_list_generation()
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        ingredients_data = validated_data.pop('ingredients', None)
+        tags_data = validated_data.pop('tags', None)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # Только изменяемые поля: полное сохранение затерло бы счетчики,
+        # увеличенные за это время через F(), и image_variants, которые
+        # пишет фоновый поток.
+        instance.save(update_fields=list(validated_data))
+        if ingredients_data is not None:
+            RecipeWriteSerializer.update_ingredients(
+                instance, ingredients_data
+            )
+        if tags_data is not None:
+            instance.tags.set(tags_data)
         return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance], 'tags',
+            Prefetch('amounts', queryset=RecipeIngredient.objects.
+                     select_related('ingredient'))
+        )
         return RecipeReadSerializer(
             instance,
             context={'request': self.context.get('request')}
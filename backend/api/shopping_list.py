@@ -0,0 +1,163 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+FONT_NAME = 'DejaVuSans'
+FONT_FILE = 'DejaVuSans.ttf'
+FILE_NAME = 'СПИСОК ПОКУПОК'
+DOC_TITLE = 'СПИСОК ПОКУПОК ДЛЯ РЕЦЕПТОВ'
+TITLE = 'СПИСОК ПОКУПОК'
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 50
+TITLE_FONT_SIZE = 24
+SUBTITLE_FONT_SIZE = 16
+TEXT_FONT_SIZE = 14
+FOOTER_FONT_SIZE = 10
+LINE_HEIGHT = 22
+BODY_TOP = PAGE_HEIGHT - 150
+BODY_BOTTOM = 70
+LINES_PER_PAGE = int((BODY_TOP - BODY_BOTTOM) // LINE_HEIGHT) + 1
+
+_fonts_lock = threading.Lock()
+_fonts_registered = False
+_pool_lock = threading.Lock()
+_pool = None
+
+
+class DocumentCache:
+    """Потокобезопасный LRU-кэш готовых документов с лимитом по байтам."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.documents = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            content = self.documents.get(key)
+            if content is not None:
+                self.documents.move_to_end(key)
+            return content
+
+    def set(self, key, content):
+        if len(content) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.documents.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.documents[key] = content
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, evicted = self.documents.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self.lock:
+            self.documents.clear()
+            self.size = 0
+
+
+document_cache = DocumentCache(
+    getattr(settings, 'SHOPPING_LIST_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+)
+
+
+def document_key(user_id, version, subtitle, file_format='pdf'):
+    return (user_id, version, subtitle, file_format)
+
+
+def document_etag(key):
+    digest = hashlib.md5(repr(key).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def register_fonts():
+    """Регистрирует шрифт один раз на процесс: разбор TTF дорогой."""
+    global _fonts_registered
+    if _fonts_registered:
+        return
+    with _fonts_lock:
+        if not _fonts_registered:
+            pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_FILE))
+            _fonts_registered = True
+
+
+def layout_lines(items):
+    """Превращает позиции (название, количество, единица) в строки,
+    перенося слишком длинные по ширине страницы."""
+    width = PAGE_WIDTH - 2 * MARGIN
+    lines = []
+    for number, (name, amount, measurement_unit) in enumerate(items, 1):
+        text = f'{number}. {name} - {amount} {measurement_unit}'
+        lines.extend(simpleSplit(text, FONT_NAME, TEXT_FONT_SIZE, width))
+    return lines
+
+
+def draw_page(pdf, lines, subtitle, page_number, pages_count):
+    pdf.setFont(FONT_NAME, TITLE_FONT_SIZE)
+    pdf.drawCentredString(PAGE_WIDTH / 2, PAGE_HEIGHT - 72, TITLE)
+    pdf.setFont(FONT_NAME, SUBTITLE_FONT_SIZE)
+    pdf.drawCentredString(PAGE_WIDTH / 2, PAGE_HEIGHT - 110, subtitle)
+    pdf.line(MARGIN - 20, PAGE_HEIGHT - 125, PAGE_WIDTH - MARGIN + 20,
+             PAGE_HEIGHT - 125)
+    pdf.setFont(FONT_NAME, TEXT_FONT_SIZE)
+    height = BODY_TOP
+    for line in lines:
+        pdf.drawString(MARGIN, height, line)
+        height -= LINE_HEIGHT
+    pdf.line(MARGIN - 20, 50, PAGE_WIDTH - MARGIN + 20, 50)
+    pdf.setFont(FONT_NAME, FOOTER_FONT_SIZE)
+    pdf.drawCentredString(PAGE_WIDTH / 2, 35,
+                          f'Страница {page_number} из {pages_count}')
+    pdf.showPage()
+
+
+def render_pdf(items, subtitle):
+    """Возвращает PDF со списком покупок в виде bytes."""
+    register_fonts()
+    lines = layout_lines(items)
+    pages = [lines[start:start + LINES_PER_PAGE]
+             for start in range(0, len(lines), LINES_PER_PAGE)] or [[]]
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    pdf.setTitle(DOC_TITLE)
+    for page_number, page in enumerate(pages, 1):
+        draw_page(pdf, page, subtitle, page_number, len(pages))
+    pdf.save()
+    return buffer.getvalue()
+
+
+def get_pool():
+    global _pool
+    size = getattr(settings, 'SHOPPING_LIST_RENDER_PROCESSES', 0)
+    if not size:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=size,
+                                        initializer=register_fonts)
+        return _pool
+
+
+def render(items, subtitle):
+    """Рендерит список в текущем процессе, а длинные списки - в пуле
+    процессов, если он включен настройкой SHOPPING_LIST_RENDER_PROCESSES."""
+    items = list(items)
+    threshold = getattr(settings, 'SHOPPING_LIST_RENDER_POOL_THRESHOLD', 500)
+    pool = get_pool() if len(items) >= threshold else None
+    if pool is None:
+        return render_pdf(items, subtitle)
+    return pool.submit(render_pdf, items, subtitle).result()
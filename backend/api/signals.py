@@ -0,0 +1,184 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_init,
+                                      post_save)
+from django.dispatch import receiver
+
+from . import (counters, images, ingredient_index, media, recipe_cache,
+               versions)
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, Subscription, Tag)
+from users.models import CustomUser
+
+
+# Поля автора, которые попадают в представление рецепта.
+AUTHOR_FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+
+def get_author_state(user):
+    # Через __dict__, чтобы не загружать отложенные поля.
+    return tuple(user.__dict__.get(field) for field in AUTHOR_FIELDS)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def bump_model_version(sender, **kwargs):
+    versions.bump_model_version(sender)
+
+
+@receiver(post_init, sender=CustomUser)
+def remember_author_state(instance, **kwargs):
+    instance._author_state = get_author_state(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def bump_author_recipe_versions(instance, created, **kwargs):
+    """Сбрасывает кэш представлений рецептов этого автора и страниц
+    списка только когда изменились отдаваемые в них поля: вход, смена
+    пароля и счетчики кэш не трогают."""
+    state = get_author_state(instance)
+    if not created and state != instance._author_state:
+        recipe_ids = list(Recipe.objects.filter(
+            author=instance
+        ).values_list('pk', flat=True))
+        if recipe_ids:
+            versions.bump_recipe_versions(recipe_ids)
+            recipe_cache.bump_list_generation()
+    instance._author_state = state
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Ingredient)
+def bump_ingredient_carts_versions(instance, **kwargs):
+    versions.bump_cart_versions(ShoppingCart.objects.filter(
+        recipe__amounts__ingredient=instance
+    ).values_list('user_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def bump_cart_version(instance, **kwargs):
+    versions.bump_cart_versions([instance.user_id])
+
+
+@receiver(post_save, sender=Recipe)
+def process_recipe_image(instance, **kwargs):
+    source = (instance.image_variants or {}).get('source')
+    if instance.image and source != instance.image.name:
+        images.schedule_variants(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def bump_recipe_carts_versions(instance, created, **kwargs):
+    if not created:
+        versions.bump_recipe_carts_versions([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def bump_recipe_ingredient_carts_versions(instance, **kwargs):
+    versions.bump_recipe_carts_versions([instance.recipe_id])
+
+
+@receiver(post_init, sender=Recipe)
+def remember_recipe_files(instance, **kwargs):
+    instance._stored_files = media.recipe_files(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_file_references(instance, created, **kwargs):
+    current = media.recipe_files(instance)
+    if current is None:
+        return
+    # Новый рецепт мог получить уже сохраненное имя файла прямо в
+    # конструкторе, но ссылок на этот файл он еще не держит.
+    previous = set() if created else instance._stored_files or set()
+    media.add_references(current - previous)
+    media.remove_references(previous - current)
+    instance._stored_files = current
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_files(instance, **kwargs):
+    media.remove_references(media.recipe_files(instance) or set())
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_list_generation(action=None, **kwargs):
+    if action is None or action.startswith('post_'):
+        recipe_cache.bump_list_generation()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def bump_recipe_version(instance, **kwargs):
+    versions.bump_recipe_versions([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def bump_recipe_ingredient_recipe_version(instance, **kwargs):
+    versions.bump_recipe_versions([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_tags_version(instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        versions.bump_recipe_versions([instance.pk])
+    elif pk_set:
+        versions.bump_recipe_versions(pk_set)
+    else:
+        versions.bump_model_version(Tag)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def bump_favorite_version(instance, **kwargs):
+    versions.bump_favorite_versions([instance.user_id])
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def bump_subscription_version(instance, **kwargs):
+    versions.bump_subscription_versions([instance.user_id])
+
+
+@receiver(post_init, sender=Favorite)
+@receiver(post_init, sender=ShoppingCart)
+@receiver(post_init, sender=Subscription)
+@receiver(post_init, sender=Recipe)
+def remember_counted_keys(instance, **kwargs):
+    counters.remember(instance)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Subscription)
+@receiver(post_save, sender=Recipe)
+def count_saved(instance, created, raw=False, **kwargs):
+    # При loaddata счетчики приходят вместе с данными.
+    if not raw:
+        counters.count_saved(instance, created)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Subscription)
+@receiver(post_delete, sender=Recipe)
+def count_deleted(instance, **kwargs):
+    counters.count_deleted(instance)
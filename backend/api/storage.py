@@ -0,0 +1,44 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, которое называет файлы по SHA-256 содержимого.
+
+    Путь имеет вид <каталог>/<2 символа хэша>/<хэш><расширение>, поэтому
+    одинаковые загрузки сохраняются один раз, а содержимое по одному и тому
+    же URL никогда не меняется и может кэшироваться навсегда.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
+
+    @staticmethod
+    def get_hashed_name(name, content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        digest = digest.hexdigest()
+        if name == os.path.join(directory, digest + extension) and (
+            os.path.basename(directory) == digest[:2]
+        ):
+            # Файл сохраняют под уже вычисленным именем (перенос между
+            # окружениями): оно не должно обрасти еще одним подкаталогом.
+            directory = os.path.dirname(directory)
+        return os.path.join(directory, digest[:2], digest + extension)
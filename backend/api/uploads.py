@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.files.uploadhandler import (FileUploadHandler,
+                                             TemporaryFileUploadHandler)
+from django.http.multipartparser import MultiPartParserError
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """Прерывает разбор multipart-запроса, как только загружаемый файл
+    превышает RECIPE_IMAGE_MAX_UPLOAD_SIZE, не дочитывая тело целиком."""
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+
+    def handle_raw_input(self, input_data,
+                         META,  # noqa: N803 имя задано Django
+                         content_length, boundary, encoding=None):
+        if content_length and content_length > 2 * self.max_size:
+            raise MultiPartParserError(self.error_message())
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            raise MultiPartParserError(self.error_message())
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+    def error_message(self):
+        return f'файл больше {self.max_size} байт'
+
+
+def get_upload_handlers(request):
+    """Файлы потоково пишутся во временный файл на диске, а не в память."""
+    return [MaxSizeUploadHandler(request),
+            TemporaryFileUploadHandler(request)]
@@ -0,0 +1,86 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import ShoppingCart
+
+CART_VERSION_KEY = 'cart_version:{}'
+FAVORITE_VERSION_KEY = 'favorite_version:{}'
+MODEL_VERSION_KEY = 'model_version:{}'
+RECIPE_VERSION_KEY = 'recipe_version:{}'
+SUBSCRIPTION_VERSION_KEY = 'subscription_version:{}'
+
+
+def get_version(key):
+    """Возвращает версию из общего кэша, заводя ее при отсутствии.
+
+    Начальное значение берется из часов, а не с нуля, чтобы после
+    вытеснения ключа версия не совпала с одной из прежних.
+    """
+    return get_versions([key])[key]
+
+
+def get_versions(keys):
+    """Как get_version, но для нескольких ключей за одно обращение."""
+    keys = list(keys)
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        found.update(cache.get_many(missing))
+    return found
+
+
+def bump_versions(keys):
+    """Сдвигает версии после коммита транзакции, иначе параллельный
+    запрос успеет закэшировать еще не закоммиченное состояние."""
+    keys = list(keys)
+    if keys:
+        transaction.on_commit(lambda: cache.set_many(
+            {key: time.time_ns() for key in keys}, None
+        ))
+
+
+def get_model_version(model):
+    return get_version(MODEL_VERSION_KEY.format(model._meta.label_lower))
+
+
+def bump_model_version(model):
+    bump_versions([MODEL_VERSION_KEY.format(model._meta.label_lower)])
+
+
+def get_cart_version(user_id):
+    return get_version(CART_VERSION_KEY.format(user_id))
+
+
+def bump_cart_versions(user_ids):
+    bump_versions(CART_VERSION_KEY.format(user_id) for user_id in user_ids)
+
+
+def bump_recipe_carts_versions(recipe_ids):
+    bump_cart_versions(ShoppingCart.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('user_id', flat=True).distinct())
+
+
+def get_recipe_versions(recipe_ids):
+    versions = get_versions(
+        RECIPE_VERSION_KEY.format(pk) for pk in recipe_ids
+    )
+    return {pk: versions[RECIPE_VERSION_KEY.format(pk)] for pk in recipe_ids}
+
+
+def bump_recipe_versions(recipe_ids):
+    bump_versions(RECIPE_VERSION_KEY.format(pk) for pk in recipe_ids)
+
+
+def bump_favorite_versions(user_ids):
+    bump_versions(FAVORITE_VERSION_KEY.format(user_id) for user_id in user_ids)
+
+
+def bump_subscription_versions(user_ids):
+    bump_versions(
+        SUBSCRIPTION_VERSION_KEY.format(user_id) for user_id in user_ids
+    )
@@ -1,43 +1,144 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import (BooleanField, Exists, OuterRef, Prefetch, Sum,
+                              Value)
+from django.http import Http404
 from django.http.response import HttpResponse
 from django.utils import timezone
 
 import django_filters
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from users.permissions import CurrentUserOrAdmin, GetPost
 
+from . import ingredient_index, recipe_cache, shopping_list, versions
+from .conditional import conditional_get, make_etag
 from .filters import RecipeFilter
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+                     ShoppingCart, Subscription, Tag)
 from .paginators import PageNumberPaginatorModified
 from .serializers import (FavouriteSerializer, IngredientSerializer,
                           RecipeReadSerializer, RecipeWriteSerializer,
                           TagSerializer)
+from .uploads import get_upload_handlers
 
+User = get_user_model()
 
-class TagViewSet(ReadOnlyModelViewSet):
+
+def get_shopping_list_key(user):
+    return shopping_list.document_key(
+        user.id, versions.get_cart_version(user.id),
+        f'{timezone.now().date()}'
+    )
+
+
+def get_shopping_list_etag(view, request, *args, **kwargs):
+    return shopping_list.document_etag(get_shopping_list_key(request.user))
+
+
+def get_catalog_etag(view, request, *args, **kwargs):
+    model = view.queryset.model
+    return make_etag(model._meta.label_lower,
+                     versions.get_model_version(model),
+                     request.get_full_path())
+
+
+def get_recipe_etag(view, request, *args, **kwargs):
+    """ETag детальной страницы: ключ кэша представления рецепта (он
+    меняется с версией рецепта, в том числе после построения копий
+    изображения) и флаги текущего пользователя."""
+    if not settings.RECIPE_DETAIL_CONDITIONAL_GET:
+        return None
+    try:
+        recipe_id = int(kwargs[view.lookup_field])
+    except (KeyError, ValueError):
+        return None
+    author_id = Recipe.objects.filter(pk=recipe_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    viewer_ids = recipe_cache.get_viewer_ids(request.user)
+    return make_etag(
+        request.user.pk,
+        recipe_cache.get_body_keys([recipe_id], request)[recipe_id],
+        recipe_id in viewer_ids['favorites'],
+        recipe_id in viewer_ids['cart'],
+        author_id in viewer_ids['following'],
+    )
+
+
+def with_representation(queryset, user=None):
+    """Аннотирует рецепты флагами пользователя и подгружает связанные
+    данные для RecipeReadSerializer; без пользователя флаги ложны."""
+    if user is not None and user.is_authenticated:
+        is_favorited = Exists(Favorite.objects.filter(
+            user=user, recipe=OuterRef('pk')
+        ))
+        is_in_shopping_cart = Exists(ShoppingCart.objects.filter(
+            user=user, recipe=OuterRef('pk')
+        ))
+        is_subscribed = Exists(Subscription.objects.filter(
+            user=user, author=OuterRef('pk')
+        ))
+    else:
+        is_favorited = is_in_shopping_cart = is_subscribed = Value(
+            False, output_field=BooleanField()
+        )
+    return queryset.annotate(
+        is_favorited=is_favorited,
+        is_in_shopping_cart=is_in_shopping_cart,
+    ).prefetch_related(
+        Prefetch('author', queryset=User.objects.annotate(
+            is_subscribed=is_subscribed
+        )),
+        'tags',
+        Prefetch('amounts', queryset=RecipeIngredient.objects.
+                 select_related('ingredient')),
+    )
+
+
+class CatalogViewSet(ReadOnlyModelViewSet):
+    """Справочник, редко меняющийся и одинаковый для всех пользователей:
+    ответы снабжаются ETag по версии модели."""
+
+    @conditional_get(get_catalog_etag, public=True,
+                     max_age=settings.CATALOG_CACHE_MAX_AGE)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get(get_catalog_etag, public=True,
+                     max_age=settings.CATALOG_CACHE_MAX_AGE)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+class TagViewSet(CatalogViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [AllowAny]
     pagination_class = None
 
-    def get_queryset(self):
-        query = self.request.GET.get('name')
-        return Ingredient.objects.filter(name__istartswith=query.lower())
+    @conditional_get(get_catalog_etag, public=True,
+                     max_age=settings.CATALOG_CACHE_MAX_AGE)
+    def list(self, request, *args, **kwargs):
+        index = ingredient_index.get_index()
+        query = request.query_params.get('name')
+        if not query:
+            return Response(index.items)
+        return Response(index.search(query))
 
 
 class RecipeViewSet(ModelViewSet):
@@ -46,6 +147,12 @@ class RecipeViewSet(ModelViewSet):
     pagination_class = PageNumberPaginatorModified
     filter_backends = [django_filters.rest_framework.DjangoFilterBackend]
     filter_class = RecipeFilter
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def initialize_request(self, request, *args, **kwargs):
+        if request.method in ('POST', 'PUT', 'PATCH'):
+            request.upload_handlers = get_upload_handlers(request)
+        return super().initialize_request(request, *args, **kwargs)
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
@@ -57,6 +164,61 @@ class RecipeViewSet(ModelViewSet):
         context.update({'request': self.request})
         return context
 
+    def load_representations(self, recipe_ids):
+        queryset = with_representation(
+            Recipe.objects.filter(pk__in=recipe_ids)
+        )
+        return RecipeReadSerializer(
+            queryset, many=True, context=self.get_serializer_context()
+        ).data
+
+    def get_representations(self, recipe_ids):
+        """Представления рецептов из общего кэша с наложенными флагами
+        текущего пользователя."""
+        viewer_ids = recipe_cache.get_viewer_ids(self.request.user)
+        return [
+            recipe_cache.apply_viewer_ids(body, viewer_ids)
+            for body in recipe_cache.get_bodies(
+                recipe_ids, self.request, self.load_representations
+            )
+        ]
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return self.list_representations()
+        data = recipe_cache.get_list_page(request)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+        response = self.list_representations()
+        if response.status_code == status.HTTP_200_OK:
+            recipe_cache.set_list_page(request, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list_representations(self):
+        queryset = self.filter_queryset(self.get_queryset()).values('id')
+        page = self.paginate_queryset(queryset)
+        recipe_ids = [row['id'] for row in (
+            page if page is not None else queryset
+        )]
+        data = self.get_representations(recipe_ids)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @conditional_get(get_recipe_etag, private=True, no_cache=True)
+    def retrieve(self, request, *args, **kwargs):
+        # Чтение рецепта доступно всем (CurrentUserOrAdmin пропускает
+        # безопасные методы), поэтому объект из базы не нужен.
+        try:
+            recipe_id = int(kwargs[self.lookup_field])
+        except ValueError:
+            raise Http404
+        data = self.get_representations([recipe_id])
+        if not data:
+            raise Http404
+        return Response(data[0])
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -114,47 +276,26 @@ class RecipeViewSet(ModelViewSet):
     @action(detail=False,
             methods=['get'],
             permission_classes=[IsAuthenticated])
+    @conditional_get(get_shopping_list_etag, private=True, no_cache=True)
     def download_shopping_cart(self, request):
-        user = request.user
-        shopping_cart = ShoppingCart.objects.filter(user=user)
-        shopping_list = {}
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__in=shopping_cart.values_list('recipe')
-        )
-        for ingredient in ingredients:
-            name = ingredient.ingredient.name
-            measurement_unit = ingredient.ingredient.measurement_unit
-            amount = ingredient.amount
-            if name not in shopping_list:
-                shopping_list[name] = {
-                    'measurement_unit': measurement_unit,
-                    'amount': amount
-                }
-            else:
-                shopping_list[name]['amount'] += amount
-        file_name = 'СПИСОК ПОКУПОК'
-        doc_title = 'СПИСОК ПОКУПОК ДЛЯ РЕЦЕПТОВ'
-        title = 'СПИСОК ПОКУПОК'
-        sub_title = f'{timezone.now().date()}'
-        response = HttpResponse(content_type='application/pdf')
+        key = get_shopping_list_key(request.user)
+        content = shopping_list.document_cache.get(key)
+        if content is None:
+            ingredients = RecipeIngredient.objects.filter(
+                recipe__customers__user=request.user
+            ).values(
+                'ingredient__name', 'ingredient__measurement_unit'
+            ).annotate(
+                total_amount=Sum('amount')
+            ).values_list(
+                'ingredient__name', 'total_amount',
+                'ingredient__measurement_unit'
+            ).order_by('ingredient__name', 'ingredient__measurement_unit')
+            content = shopping_list.render(ingredients, subtitle=key[2])
+            shopping_list.document_cache.set(key, content)
+        response = HttpResponse(content, content_type='application/pdf')
+        file_name = shopping_list.FILE_NAME
         content_disposition = f'attachment; filename="{file_name}.pdf"'
         response['Content-Disposition'] = content_disposition
-        pdf = canvas.Canvas(response)
-        pdf.setTitle(doc_title)
-        pdfmetrics.registerFont(TTFont('Dej', 'DejaVuSans.ttf'))
-        pdf.setFont('Dej', 24)
-        pdf.drawCentredString(300, 770, title)
-        pdf.setFont('Dej', 16)
-        pdf.drawCentredString(290, 720, sub_title)
-        pdf.line(30, 710, 565, 710)
-        height = 670
-        for name, data in shopping_list.items():
-            pdf.drawString(
-                50,
-                height,
-                f"{name} - {data['amount']} {data['measurement_unit']}"
-            )
-            height -= 25
-        pdf.showPage()
-        pdf.save()
+        response['Content-Length'] = len(content)
         return response
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 import environ
@@ -25,6 +26,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_filters',
     'users',
     'api',
@@ -35,6 +37,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.QueryTimingMiddleware',
+    'api.middleware.NPlusOneMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -42,6 +47,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -78,6 +84,10 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME':
@@ -122,6 +132,8 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+DEFAULT_FILE_STORAGE = 'api.storage.ContentAddressedStorage'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
@@ -141,6 +153,55 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+SHOPPING_LIST_RENDER_PROCESSES = env.int('SHOPPING_LIST_RENDER_PROCESSES',
+                                         default=0)
+SHOPPING_LIST_RENDER_POOL_THRESHOLD = env.int(
+    'SHOPPING_LIST_RENDER_POOL_THRESHOLD', default=500
+)
+SHOPPING_LIST_CACHE_MAX_BYTES = env.int('SHOPPING_LIST_CACHE_MAX_BYTES',
+                                        default=32 * 1024 * 1024)
+
+CATALOG_CACHE_MAX_AGE = env.int('CATALOG_CACHE_MAX_AGE', default=60)
+RECIPE_LIST_CACHE_TIMEOUT = env.int('RECIPE_LIST_CACHE_TIMEOUT', default=300)
+RECIPE_CACHE_TIMEOUT = env.int('RECIPE_CACHE_TIMEOUT', default=24 * 60 * 60)
+RECIPE_DETAIL_CONDITIONAL_GET = env.bool('RECIPE_DETAIL_CONDITIONAL_GET',
+                                         default=False)
+
+IMAGE_VARIANT_WORKERS = env.int('IMAGE_VARIANT_WORKERS', default=2)
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = env.int('RECIPE_IMAGE_MAX_UPLOAD_SIZE',
+                                       default=10 * 1024 * 1024)
+
+SQL_TIMING_SAMPLE_RATE = env.float('SQL_TIMING_SAMPLE_RATE', default=0.0)
+SQL_TIMING_SLOWEST = env.int('SQL_TIMING_SLOWEST', default=3)
+SQL_TIMING_DUPLICATES = env.int('SQL_TIMING_DUPLICATES', default=5)
+N_PLUS_ONE_THRESHOLD = env.int('N_PLUS_ONE_THRESHOLD', default=0)
+N_PLUS_ONE_RAISE = env.bool('N_PLUS_ONE_RAISE', default=False)
+
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
+
+PROFILING_ENABLED = env.bool('PROFILING_ENABLED', default=False)
+PROFILING_DIR = env.str(
+    'PROFILING_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'foodgram-profiles')
+)
+PROFILING_KEEP = env.int('PROFILING_KEEP', default=20)
+PROFILING_INTERVAL = env.float('PROFILING_INTERVAL', default=0.005)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.middleware': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
 
@@ -0,0 +1,31 @@
+import os
+import shutil
+
+from prometheus_client import multiprocess
+
+workers = int(os.environ.get('GUNICORN_WORKERS', 1))
+
+
+def on_starting(server):
+    """Не дает запустить несколько воркеров с кэшем в памяти процесса:
+    версии кэша разойдутся между воркерами, и они будут отдавать
+    устаревшие данные. Значения метрик прошлого запуска не должны
+    попасть в новые."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    from django.conf import settings
+
+    backend = settings.CACHES['default']['BACKEND']
+    if server.cfg.workers > 1 and backend.endswith('LocMemCache'):
+        raise RuntimeError(
+            f'{server.cfg.workers} воркеров с кэшем LocMemCache: задайте '
+            'общий кэш в CACHE_URL или оставьте один воркер'
+        )
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(worker.pid)
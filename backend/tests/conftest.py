@@ -0,0 +1,78 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated(settings, tmp_path):
+    """Свой каталог файлов и пустые кэши: версии в кэше пережили бы
+    откат транзакции, а id в новой базе совпадают с прежними."""
+    from django.core.cache import cache
+
+    from api import ingredient_index, shopping_list
+
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_VARIANT_WORKERS = 0
+    cache.clear()
+    shopping_list.document_cache.clear()
+    ingredient_index.invalidate()
+    yield
+    cache.clear()
+    shopping_list.document_cache.clear()
+    ingredient_index.invalidate()
+
+
+@pytest.fixture
+def make_user(django_user_model):
+    def make(number):
+        return django_user_model.objects.create_user(
+            username=f'user{number}', email=f'user{number}@example.com',
+            password='password', first_name='Имя', last_name='Фамилия'
+        )
+    return make
+
+
+@pytest.fixture
+def tags():
+    from api.models import Tag
+
+    return [Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (('Завтрак', '#E26C2D', 'breakfast'),
+                                      ('Обед', '#49B64E', 'lunch'))]
+
+
+@pytest.fixture
+def ingredients():
+    from api.models import Ingredient
+
+    return [Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(4)]
+
+
+@pytest.fixture
+def make_recipe(tags, ingredients):
+    from api.models import Recipe, RecipeIngredient
+
+    def make(author, number):
+        recipe = Recipe.objects.create(
+            author=author, name=f'Рецепт {number}', text='Описание',
+            cooking_time=10, image='recipes/test.jpg'
+        )
+        recipe.tags.set(tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=number + 1)
+            for ingredient in ingredients
+        )
+        return recipe
+    return make
+
+
+@pytest.fixture
+def client_for():
+    from rest_framework.test import APIClient
+
+    def make(user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+    return make
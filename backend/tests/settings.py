@@ -0,0 +1,12 @@
+import os
+
+# Настройки проекта читают окружение при импорте; без .env тесты
+# запускаются на SQLite.
+for name, value in (('SECRET_KEY', 'foodgram-tests'),
+                    ('DB_ENGINE', 'django.db.backends.sqlite3'),
+                    ('DB_NAME', ':memory:'),
+                    ('POSTGRES_USER', ''), ('POSTGRES_PASSWORD', ''),
+                    ('DB_HOST', ''), ('DB_PORT', '')):
+    os.environ.setdefault(name, value)
+
+from foodgram.settings import *  # noqa: E402,F401,F403
@@ -0,0 +1,64 @@
+import pytest
+from django.core.management import call_command
+
+from api.models import Recipe, ShoppingCart, Subscription
+
+pytestmark = pytest.mark.django_db
+
+
+def get_counts(recipe):
+    recipe.refresh_from_db()
+    recipe.author.refresh_from_db()
+    return (recipe.favorites_count, recipe.in_carts_count,
+            recipe.author.recipes_count, recipe.author.subscribers_count)
+
+
+def test_counters_follow_api_actions(make_user, make_recipe, client_for):
+    author, reader = make_user(1), make_user(2)
+    recipe = make_recipe(author, 1)
+    make_recipe(author, 2)
+    client = client_for(reader)
+    url = f'/api/recipes/{recipe.pk}/'
+
+    assert client.get(url + 'favorite/').status_code == 201
+    assert client.get(url + 'favorite/').status_code == 400
+    assert client.get(url + 'shopping_cart/').status_code == 201
+    assert client.get(
+        f'/api/users/{author.pk}/subscribe/'
+    ).status_code == 201
+    assert get_counts(recipe) == (1, 1, 2, 1)
+
+    assert client.delete(url + 'favorite/').status_code == 204
+    assert client.delete(url + 'favorite/').status_code == 400
+    Recipe.objects.exclude(pk=recipe.pk).delete()
+    assert get_counts(recipe) == (0, 1, 1, 1)
+
+
+def test_counters_do_not_go_below_zero(make_user, make_recipe):
+    recipe = make_recipe(make_user(1), 1)
+    cart = ShoppingCart.objects.create(user=make_user(2), recipe=recipe)
+    Recipe.objects.filter(pk=recipe.pk).update(in_carts_count=0)
+
+    cart.delete()
+
+    assert get_counts(recipe)[1] == 0
+
+
+def test_rebuild_counters_fixes_drifted_values(make_user, make_recipe,
+                                               capsys):
+    author, reader = make_user(1), make_user(2)
+    recipe = make_recipe(author, 1)
+    Subscription.objects.create(user=reader, author=author)
+    ShoppingCart.objects.create(user=reader, recipe=recipe)
+    Recipe.objects.filter(pk=recipe.pk).update(favorites_count=5,
+                                               in_carts_count=0)
+    type(author).objects.filter(pk=author.pk).update(recipes_count=0)
+
+    call_command('rebuild_counters')
+
+    assert get_counts(recipe) == (0, 1, 1, 1)
+    output = capsys.readouterr().out
+    assert 'api.Recipe.favorites_count: исправлено записей 1' in output
+    assert 'users.CustomUser.subscribers_count: исправлено записей 0' in (
+        output
+    )
@@ -0,0 +1,57 @@
+import io
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from api import images, media
+from api.models import Recipe, StoredFile
+
+pytestmark = pytest.mark.django_db
+
+
+def save_image(name, color, size=(800, 600)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='JPEG')
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def get_references():
+    return dict(StoredFile.objects.values_list('name', 'references'))
+
+
+def test_repeated_variant_generation_keeps_references(make_user):
+    source = save_image('recipes/soup.jpg', 'orange')
+    recipe = Recipe.objects.create(
+        author=make_user(1), name='Суп', text='Описание', cooking_time=10,
+        image=source
+    )
+
+    images.generate_variants(recipe.pk, source)
+    first = media.recipe_files(Recipe.objects.get(pk=recipe.pk))
+    images.generate_variants(recipe.pk, source)
+    second = media.recipe_files(Recipe.objects.get(pk=recipe.pk))
+
+    # Исходник 800 px: копии 320 и 640 px в двух форматах.
+    assert len(second) == 5
+    references = get_references()
+    assert {name: references[name] for name in second} == dict.fromkeys(
+        second, 1
+    )
+    assert all(references.get(name, 0) == 0 for name in first - second)
+
+
+def test_variants_for_replaced_image_are_dropped(make_user):
+    source = save_image('recipes/soup.jpg', 'orange')
+    recipe = Recipe.objects.create(
+        author=make_user(1), name='Суп', text='Описание', cooking_time=10,
+        image=source
+    )
+    recipe.image = save_image('recipes/salad.jpg', 'green')
+    recipe.save(update_fields=['image'])
+
+    images.generate_variants(recipe.pk, source)
+
+    assert Recipe.objects.get(pk=recipe.pk).image_variants == {}
+    assert get_references() == {source: 0, recipe.image.name: 1}
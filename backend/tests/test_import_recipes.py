@@ -0,0 +1,44 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+from api.models import Recipe, RecipeIngredient
+
+pytestmark = pytest.mark.django_db
+
+
+def make_record(number, email):
+    return {
+        'id': number,
+        'author': {'email': email, 'username': email.split('@')[0],
+                   'first_name': 'Имя', 'last_name': 'Фамилия'},
+        'name': f'Рецепт {number}',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'image': 'recipes/test.jpg',
+        'image_variants': {},
+        'tags': [{'name': 'Обед', 'color': '#49B64E', 'slug': 'lunch'}],
+        'ingredients': [
+            {'name': 'Соль', 'measurement_unit': 'г', 'amount': number + 1},
+        ],
+    }
+
+
+def test_import_twice_does_not_duplicate(tmp_path, capsys):
+    path = tmp_path / 'recipes.ndjson'
+    records = [make_record(number, f'author{number % 2}@example.com')
+               for number in range(5)]
+    path.write_text(''.join(json.dumps(record, ensure_ascii=False) + '\n'
+                            for record in records), encoding='utf-8')
+
+    call_command('import_recipes', str(path), chunk_size=2)
+    call_command('import_recipes', str(path), chunk_size=2)
+
+    assert Recipe.objects.count() == 5
+    assert RecipeIngredient.objects.count() == 5
+    assert 'Загружено рецептов: 0, пропущено: 5' in capsys.readouterr().err
+    recipe = Recipe.objects.get(name='Рецепт 3')
+    assert recipe.author.email == 'author1@example.com'
+    assert recipe.amounts.get().amount == 4
+    assert list(recipe.tags.values_list('slug', flat=True)) == ['lunch']
@@ -0,0 +1,49 @@
+import io
+import json
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from api.management.commands.load_ingredients import iter_json_array
+from api.models import Ingredient
+
+ITEMS = [
+    2.5, 1e3, -0.25, 12345, 0, True, None, 'строка, с ] внутри',
+    {'name': 'Соль', 'measurement_unit': 'г'}, [1, [2.75, 3]], 'x' * 40,
+]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 16, 64, 4096])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_iter_json_array_at_any_chunk_boundary(chunk_size, indent):
+    text = json.dumps(ITEMS, ensure_ascii=False, indent=indent)
+
+    items = list(iter_json_array(io.StringIO(text), chunk_size))
+
+    assert items == ITEMS
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 4096])
+@pytest.mark.parametrize('text', ['[2.]', '[1 2]', '[1, 2', '{"a": 1}', ''])
+def test_iter_json_array_rejects_invalid_json(chunk_size, text):
+    with pytest.raises(CommandError):
+        list(iter_json_array(io.StringIO(text), chunk_size))
+
+
+@pytest.mark.django_db
+def test_load_ingredients_skips_duplicates(tmp_path):
+    Ingredient.objects.create(name='соль', measurement_unit='г')
+    path = tmp_path / 'ingredients.json'
+    path.write_text(json.dumps([
+        {'name': 'соль', 'measurement_unit': 'г'},
+        {'name': 'сахар', 'measurement_unit': 'г'},
+        {'name': 'сахар', 'measurement_unit': 'г'},
+        {'name': 'молоко', 'measurement_unit': 'мл'},
+    ], ensure_ascii=False), encoding='utf-8')
+
+    call_command('load_ingredients', str(path))
+
+    assert sorted(Ingredient.objects.values_list(
+        'name', 'measurement_unit'
+    )) == [('молоко', 'мл'), ('сахар', 'г'), ('соль', 'г')]
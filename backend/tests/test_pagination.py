@@ -0,0 +1,57 @@
+import pytest
+
+from api import paginators
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('estimate', [1, 1000])
+def test_approximate_count_does_not_change_page_bounds(
+        estimate, monkeypatch, make_user, make_recipe, client_for):
+    monkeypatch.setattr(paginators, 'estimate_count', lambda queryset:
+                        estimate)
+    author = make_user(1)
+    for number in range(5):
+        make_recipe(author, number)
+    client = client_for(author)
+    url = '/api/recipes/?count=approximate&limit=2'
+
+    first = client.get(url).data
+    assert len(first['results']) == 2
+    assert first['previous'] is None
+    assert 'page=2' in first['next']
+    assert first['count'] == max(estimate, 2)
+
+    last = client.get(url + '&page=3').data
+    assert len(last['results']) == 1
+    assert last['next'] is None
+    assert 'page=2' in last['previous']
+
+    assert client.get(url + '&page=4').status_code == 404
+
+
+def test_cursor_is_rejected_with_search(make_user, make_recipe, client_for):
+    author = make_user(1)
+    make_recipe(author, 1)
+    client = client_for(author)
+    assert client.get('/api/recipes/?search=Рецепт').status_code == 200
+    response = client.get('/api/recipes/?search=Рецепт&cursor=')
+    assert response.status_code == 400
+    assert 'cursor' in response.data
+
+
+def test_cursor_keeps_subscriptions_order(make_user, client_for):
+    from api.models import Subscription
+
+    viewer = make_user(0)
+    for number in range(1, 5):
+        Subscription.objects.create(user=viewer, author=make_user(number))
+    client = client_for(viewer)
+    url = '/api/users/subscriptions/?limit=2'
+    pages = client.get(url).data['results'] + client.get(
+        url + '&page=2'
+    ).data['results']
+    first = client.get(url + '&cursor=').data
+    cursors = first['results'] + client.get(first['next']).data['results']
+    assert ([author['email'] for author in cursors]
+            == [author['email'] for author in pages])
@@ -0,0 +1,66 @@
+import pytest
+
+from api.models import Favorite, ShoppingCart, Subscription
+from api.queries import max_queries
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.mark.parametrize('count', [2, 6])
+def test_recipe_list_does_not_repeat_queries(count, make_user, make_recipe,
+                                             client_for):
+    author, viewer = make_user(1), make_user(2)
+    recipes = [make_recipe(author, number) for number in range(count)]
+    Favorite.objects.create(user=viewer, recipe=recipes[0])
+    Subscription.objects.create(user=viewer, author=author)
+    client = client_for(viewer)
+    with max_queries(9, repeats=1):
+        response = client.get('/api/recipes/?limit=10')
+    assert response.status_code == 200
+    assert len(response.data['results']) == count
+    assert response.data['results'][-1]['is_favorited']
+
+
+@pytest.mark.parametrize('count', [2, 6])
+def test_subscriptions_with_recipes_limit(count, make_user, make_recipe,
+                                          client_for):
+    viewer = make_user(0)
+    for number in range(1, count + 1):
+        author = make_user(number)
+        Subscription.objects.create(user=viewer, author=author)
+        for recipe_number in range(4):
+            make_recipe(author, recipe_number)
+    client = client_for(viewer)
+    with max_queries(3, repeats=1):
+        response = client.get('/api/users/subscriptions/?recipes_limit=2')
+    assert response.status_code == 200
+    results = response.data['results']
+    assert len(results) == count
+    assert all(len(author['recipes']) == 2 for author in results)
+    assert all(author['recipes_count'] == 4 for author in results)
+
+
+@pytest.mark.parametrize('count', [2, 6])
+def test_download_shopping_cart(count, make_user, make_recipe, client_for):
+    author, viewer = make_user(1), make_user(2)
+    for number in range(count):
+        ShoppingCart.objects.create(user=viewer,
+                                    recipe=make_recipe(author, number))
+    client = client_for(viewer)
+    with max_queries(1, repeats=1):
+        response = client.get('/api/recipes/download_shopping_cart/')
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/pdf'
+
+
+def test_max_queries_reports_repeated_shapes(make_user, make_recipe):
+    from api.models import Recipe
+    from api.queries import QueryLimitExceeded
+
+    author = make_user(1)
+    for number in range(3):
+        make_recipe(author, number)
+    with pytest.raises(QueryLimitExceeded, match='повторен 3 раз'):
+        with max_queries(repeats=1):
+            for recipe in Recipe.objects.all():
+                recipe.author.username
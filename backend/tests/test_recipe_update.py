@@ -0,0 +1,104 @@
+import pytest
+
+from api.models import RecipeIngredient
+
+# Версии кэша сдвигаются в transaction.on_commit.
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def get_amounts(response):
+    return {item['id']: item['amount']
+            for item in response.data['ingredients']}
+
+
+def test_patch_ingredients_updates_rows_in_place(make_user, make_recipe,
+                                                 ingredients, client_for):
+    author = make_user(1)
+    recipe = make_recipe(author, 1)
+    client = client_for(author)
+    url = f'/api/recipes/{recipe.pk}/'
+    kept, changed, removed, added = ingredients
+    recipe.amounts.filter(ingredient=added).delete()
+    rows = dict(recipe.amounts.values_list('ingredient_id', 'id'))
+    assert get_amounts(client.get(url)) == {
+        kept.pk: 2, changed.pk: 2, removed.pk: 2
+    }
+
+    response = client.patch(url, {'ingredients': [
+        {'id': kept.pk, 'amount': 2},
+        {'id': changed.pk, 'amount': 4},
+        {'id': removed.pk, 'amount': 2},
+    ]}, format='json')
+
+    assert response.status_code == 200
+    assert get_amounts(client.get(url)) == {
+        kept.pk: 2, changed.pk: 4, removed.pk: 2
+    }
+
+    response = client.patch(url, {'ingredients': [
+        {'id': kept.pk, 'amount': 2},
+        {'id': changed.pk, 'amount': 5},
+        {'id': added.pk, 'amount': 7},
+    ]}, format='json')
+
+    assert response.status_code == 200
+    assert get_amounts(client.get(url)) == {
+        kept.pk: 2, changed.pk: 5, added.pk: 7
+    }
+    assert recipe.amounts.get(ingredient=kept).id == rows[kept.pk]
+    assert recipe.amounts.get(ingredient=changed).id == rows[changed.pk]
+    assert not RecipeIngredient.objects.filter(ingredient=removed).exists()
+
+
+def test_recipe_edit_reaches_cached_list_and_detail(make_user, make_recipe,
+                                                    client_for):
+    author = make_user(1)
+    recipe = make_recipe(author, 1)
+    client = client_for(make_user(2))
+    url = f'/api/recipes/{recipe.pk}/'
+    assert client.get('/api/recipes/').data['results'][0]['name'] == (
+        'Рецепт 1'
+    )
+    assert client.get(url).data['cooking_time'] == 10
+
+    response = client_for(author).patch(
+        url, {'name': 'Новое название', 'cooking_time': 25}, format='json'
+    )
+
+    assert response.status_code == 200
+    assert client.get('/api/recipes/').data['results'][0]['name'] == (
+        'Новое название'
+    )
+    assert client.get(url).data['cooking_time'] == 25
+
+
+def test_author_edit_reaches_cached_recipe(make_user, make_recipe,
+                                           client_for):
+    author = make_user(1)
+    recipe = make_recipe(author, 1)
+    client = client_for(make_user(2))
+    url = f'/api/recipes/{recipe.pk}/'
+    assert client.get(url).data['author']['first_name'] == 'Имя'
+
+    author.first_name = 'Другое'
+    author.save()
+
+    assert client.get(url).data['author']['first_name'] == 'Другое'
+    assert client.get('/api/recipes/').data['results'][0]['author'][
+        'first_name'
+    ] == 'Другое'
+
+
+def test_favorite_reaches_cached_list_and_detail(make_user, make_recipe,
+                                                 client_for):
+    recipe = make_recipe(make_user(1), 1)
+    client = client_for(make_user(2))
+    url = f'/api/recipes/{recipe.pk}/'
+    assert not client.get(url).data['is_favorited']
+    assert not client.get('/api/recipes/').data['results'][0]['is_favorited']
+
+    assert client.get(url + 'favorite/').status_code == 201
+
+    assert client.get(url).data['is_favorited']
+    assert client.get('/api/recipes/').data['results'][0]['is_favorited']
+    assert client.get('/api/recipes/?is_favorited=1').data['count'] == 1
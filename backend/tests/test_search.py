@@ -0,0 +1,53 @@
+import pytest
+
+from api.models import Recipe
+from api.search import search_recipes
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(make_user):
+    author = make_user(1)
+    return {
+        name: Recipe.objects.create(author=author, name=name, text=text,
+                                    cooking_time=10)
+        for name, text in (
+            ('Борщ украинский', 'Свекла, капуста и картофель'),
+            ('Свекольный салат', 'Отварная свекла с чесноком'),
+            ('Картофельное пюре', 'Картофель и молоко'),
+            ('Омлет', 'Яйца и молоко, подавать с борщом не стоит'),
+        )
+    }
+
+
+def search(query):
+    return list(search_recipes(Recipe.objects.all(), query).values_list(
+        'name', flat=True
+    ))
+
+
+@pytest.mark.parametrize('query', ['борщ', 'БОРЩ', 'Борщ', 'борща'])
+def test_cyrillic_case_and_ending(recipes, query):
+    assert search(query) == ['Борщ украинский', 'Омлет']
+
+
+def test_name_matches_rank_above_text_matches(recipes):
+    # "картофель" в названии пюре и в описании борща.
+    assert search('картофель') == ['Картофельное пюре', 'Борщ украинский']
+
+
+def test_every_word_must_match(recipes):
+    assert search('свекла капуста') == ['Борщ украинский']
+    assert search('молоко яйца') == ['Омлет']
+
+
+def test_fallback_does_not_find_other_forms_or_typos(recipes):
+    # На PostgreSQL "свекольный" нашел бы и свеклу по триграммам, а
+    # "борш" - борщ; здесь совпадает только начало слова.
+    assert search('свекольный') == ['Свекольный салат']
+    assert search('борш') == []
+
+
+def test_blank_query_keeps_queryset(recipes):
+    assert len(search('  ')) == len(recipes)
@@ -9,4 +9,5 @@ class UserAdmin(admin.ModelAdmin):
     search_fields = ('email', 'username')
     empty_value_display = '-пусто-'
     list_display = ('id', 'username', 'email', 'first_name',
-                    'last_name', 'is_staff')
+                    'last_name', 'is_staff', 'recipes_count',
+                    'subscribers_count')
@@ -1,10 +1,16 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
+from django.db.models import Exists, F, OuterRef, Window
+from django.db.models.functions import RowNumber
 
-from api.models import Subscription
-from api.serializers import SubscribeSerializer
+from api.models import Recipe, Subscription
+from api.paginators import PageNumberPaginatorModified
+from api.serializers import RECIPES_LIMIT_DEFAULT, SubscribeSerializer
 from djoser.serializers import SetPasswordSerializer
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -15,10 +21,50 @@ from .serializers import UserSerializer
 User = get_user_model()
 
 
+def attach_limited_recipes(authors, limit):
+    """Загружает не более limit последних рецептов каждого автора
+    одним запросом с ROW_NUMBER() OVER (PARTITION BY author_id), только
+    с полями карточки рецепта."""
+    authors = list(authors)
+    if not authors:
+        return authors
+    ranked = Recipe.objects.filter(author__in=authors).only(
+        'id', 'author_id', 'name', 'image', 'image_variants', 'cooking_time'
+    ).annotate(
+        row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=F('id').desc(),
+        )
+    )
+    sql, params = ranked.query.sql_with_params()
+    recipes = list(Recipe.objects.raw(
+        f'SELECT * FROM ({sql}) ranked WHERE ranked.row_number <= %s '
+        'ORDER BY ranked.author_id, ranked.id DESC',
+        (*params, limit)
+    ))
+    recipes_by_author = defaultdict(list)
+    for recipe in recipes:
+        recipes_by_author[recipe.author_id].append(recipe)
+    for author in authors:
+        author.limited_recipes = recipes_by_author[author.id]
+    return authors
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all().order_by('id')
     serializer_class = UserSerializer
     permission_classes = [GetPost]
+    pagination_class = PageNumberPaginatorModified
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if self.action not in ('list', 'retrieve') or user.is_anonymous:
+            return queryset
+        return queryset.annotate(is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef('pk'))
+        ))
 
     def perform_create(self, serializer):
         username = serializer.validated_data['username']
@@ -26,7 +72,7 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.save()
         user = get_object_or_404(User, username=username)
         user.set_password(password)
-        user.save()
+        user.save(update_fields=['password'])
 
     @action(detail=False,
             methods=['get'],
@@ -46,26 +92,49 @@ class UserViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         new_password = serializer.validated_data['new_password']
         self.request.user.set_password(new_password)
-        self.request.user.save()
+        self.request.user.save(update_fields=['password'])
         return Response(data={}, status=status.HTTP_201_CREATED)
 
     @action(detail=False,
             methods=['get'],
             permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
+        recipes_limit = self.get_recipes_limit()
         queryset = User.objects.filter(
-            subscriber__user=request.user).order_by('id')
+            subscriber__user=request.user
+        ).annotate(
+            is_subscribed=Exists(Subscription.objects.filter(
+                user=request.user, author=OuterRef('pk')
+            )),
+        ).order_by('id')
+        context = {'request': request, 'recipes_limit': recipes_limit}
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = SubscribeSerializer(
-                page, many=True, context={'request': request}
+                attach_limited_recipes(page, recipes_limit),
+                many=True, context=context
             )
             return self.get_paginated_response(serializer.data)
         serializer = SubscribeSerializer(
-            page, many=True, context={'request': request}
+            attach_limited_recipes(queryset, recipes_limit),
+            many=True, context=context
         )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit is None:
+            return RECIPES_LIMIT_DEFAULT
+        try:
+            recipes_limit = int(recipes_limit)
+        except ValueError:
+            recipes_limit = -1
+        if recipes_limit < 0:
+            raise ValidationError({
+                'recipes_limit': 'Ожидается целое неотрицательное число'
+            })
+        return recipes_limit
+
     @action(detail=True,
             methods=['get', 'delete'],
             permission_classes=[IsAuthenticated])